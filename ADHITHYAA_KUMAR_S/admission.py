@@ -0,0 +1,220 @@
+# admission.py - BANKBOT AI - per-client rate limits and upstream admission
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+class AdmissionRejected(Exception):
+    """Request refused before reaching Gemini; answer with 429"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now, wanted=1):
+        """Take as many whole tokens as are free, up to wanted; returns
+        (taken, 0 or seconds until the next one is free if short)"""
+        # now can predate a bucket created after it was read
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = max(now, self.updated)
+        taken = min(wanted, int(self.tokens))
+        self.tokens -= taken
+        if taken < wanted:
+            return taken, (1 - self.tokens) / self.rate
+        return taken, 0.0
+
+
+class _AsyncWaiter:
+    """A coroutine queued for an upstream slot; granted from any thread"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Token bucket per client plus a global cap on concurrent Gemini calls
+
+    Calls over the cap wait in a bounded queue until a slot frees up or
+    their deadline passes; when the queue is already full they are
+    rejected straight away. Threads use upstream_slot(), coroutines
+    upstream_slot_async(); a slot freed while coroutines wait is handed
+    straight to the oldest of them.
+    """
+
+    def __init__(self, rate_per_min=30, burst=10, max_concurrent=16,
+                 max_queue=64, queue_timeout=10.0, max_clients=10000,
+                 batch_rate_per_min=None, batch_burst=None):
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        # Batches spend their own bucket so a pre-generation job neither
+        # drains a client's chat tokens nor is held to chat's pace
+        self.limits = {
+            "chat": (self.rate, burst),
+            "batch": ((batch_rate_per_min or rate_per_min) / 60.0,
+                      batch_burst or burst),
+        }
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+
+        self._buckets = OrderedDict()  # client id -> TokenBucket, LRU
+        self._bucket_lock = threading.Lock()
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._async_waiters = deque()
+
+        self.admitted = 0
+        self.rate_limited = 0
+        self.queue_full = 0
+        self.queue_timeouts = 0
+
+    def check_rate(self, client_id, cost=1, limit="chat"):
+        """Spend the client's tokens from the limit's bucket ("chat" or
+        "batch"), one per upstream call, or raise AdmissionRejected if it
+        has none
+
+        Returns how many of the cost's calls may go ahead (fewer than
+        cost when the bucket runs dry part way) and, if short, seconds
+        until the next token.
+        """
+        now = time.monotonic()
+        key = (limit, client_id)
+        with self._bucket_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(*self.limits[limit])
+                # Forget the least recently seen clients past the cap
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            taken, wait = bucket.take(now, cost)
+            if wait:
+                self.rate_limited += 1
+        if not taken:
+            raise AdmissionRejected("rate_limited", wait)
+        return taken, wait
+
+    @contextmanager
+    def upstream_slot(self):
+        """Hold one of the max_concurrent Gemini slots for the block"""
+        with self._cond:
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    self.queue_full += 1
+                    raise AdmissionRejected("queue_full", self.queue_timeout)
+
+                self._waiting += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.queue_timeouts += 1
+                            raise AdmissionRejected("queue_timeout", self.queue_timeout)
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._active += 1
+            self.admitted += 1
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def upstream_slot_async(self):
+        """upstream_slot() for coroutines; waits without blocking the loop"""
+        waiter = None
+        with self._cond:
+            if self._active < self.max_concurrent and not self._async_waiters:
+                self._active += 1
+                self.admitted += 1
+            elif self._waiting >= self.max_queue:
+                self.queue_full += 1
+                raise AdmissionRejected("queue_full", self.queue_timeout)
+            else:
+                waiter = _AsyncWaiter()
+                self._async_waiters.append(waiter)
+                self._waiting += 1
+
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._cond:
+                    granted = waiter.granted
+                    if not granted:
+                        self._async_waiters.remove(waiter)
+                        self._waiting -= 1
+                        if isinstance(e, asyncio.TimeoutError):
+                            self.queue_timeouts += 1
+                if not granted:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise AdmissionRejected("queue_timeout", self.queue_timeout)
+                    raise
+                if isinstance(e, asyncio.CancelledError):
+                    # Granted as it was cancelled: pass the slot on
+                    self._release()
+                    raise
+                # Timed out just as the slot arrived: use it
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._cond:
+            if self._async_waiters:
+                # The slot changes hands; _active stays the same
+                self._async_waiters.popleft().grant()
+                self._waiting -= 1
+                self.admitted += 1
+            else:
+                self._active -= 1
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            active, waiting = self._active, self._waiting
+        return {
+            "active": active,
+            "waiting": waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "queue_full": self.queue_full,
+            "queue_timeouts": self.queue_timeouts,
+            "clients_tracked": len(self._buckets),
+        }
@@ -1,20 +1,94 @@
 # ai_backend.py - BANKBOT AI - FINAL PRODUCTION VERSION
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import requests
 import time
 import os
 from dotenv import load_dotenv
-import hashlib
-import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from response_cache import ResponseCache, SQLiteStore
+from canonicalize import cache_key
+from singleflight import SingleFlight
+from gemini_client import GeminiClient
+from sanitizer import ResponseSanitizer, FORBIDDEN_PHRASES
+from metrics import Metrics
+from admission import AdmissionController, AdmissionRejected
+from token_ledger import TokenLedger, parse_usage
+from circuit_breaker import CircuitBreaker
+from local_faq import local_answer, DEGRADED_MESSAGE
 
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
-response_cache = {}
+RESPONSE_FOOTER = "\n\n---\n*🤖 BankBot AI*"
+
 CACHE_TIMEOUT = 60  # seconds
+# Past CACHE_TIMEOUT an entry is still served for this long while one
+# background call refreshes it; after that (the hard max age) it is a miss
+CACHE_STALE_GRACE = float(os.getenv("CACHE_STALE_GRACE", "240"))
+CACHE_MAX_AGE = CACHE_TIMEOUT + CACHE_STALE_GRACE
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", "4"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+# Optional SQLite file shared by all workers and kept across restarts
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "")
+
+response_cache = ResponseCache(
+    ttl=CACHE_TIMEOUT,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    store=SQLiteStore(CACHE_DB_PATH, ttl=CACHE_MAX_AGE) if CACHE_DB_PATH else None,
+    stale_ttl=CACHE_STALE_GRACE,
+)
+response_cache.start_sweeper()
+
+refresher = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS,
+                               thread_name_prefix="cache-refresh")
+refreshing = set()  # prompt hashes with a refresh queued or running
+refreshing_lock = threading.Lock()
+
+# Identical prompts arriving while a Gemini call is running wait for it
+inflight = SingleFlight()
+
+metrics = Metrics()
+ledger = TokenLedger()
+
+# Admission in front of Gemini; cache hits never reach it
+admission = AdmissionController(
+    rate_per_min=float(os.getenv("RATE_LIMIT_PER_MIN", "30")),
+    burst=int(os.getenv("RATE_LIMIT_BURST", "10")),
+    max_concurrent=int(os.getenv("UPSTREAM_MAX_CONCURRENT", "16")),
+    max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "64")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")),
+    # /api/chat/batch: a full batch (BATCH_MAX_PROMPTS) goes through at
+    # once, and a client can keep up about two of those a minute
+    batch_rate_per_min=float(os.getenv("BATCH_RATE_LIMIT_PER_MIN", "1000")),
+    batch_burst=int(os.getenv("BATCH_RATE_LIMIT_BURST", "500")),
+)
+# Behind a reverse proxy every request comes from the proxy's address; set
+# this to the header the proxy overwrites with the real one (X-Real-IP, or
+# X-Forwarded-For, whose last entry the proxy appends)
+TRUSTED_CLIENT_IP_HEADER = os.getenv("TRUSTED_CLIENT_IP_HEADER", "")
+
+# Stops calling Gemini after repeated failures; local FAQ answers meanwhile
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+    recovery_timeout=float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30")),
+)
+
+# /api/chat/batch limits
+BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+
+# Sent as Gemini's systemInstruction rather than wrapped around every query
+SYSTEM_INSTRUCTION = """You are BankBot AI, a neutral, brand-agnostic banking assistant.
+- Never name any bank and never say "our bank" or "we offer"; use generic terms like "banks typically" or "financial institutions".
+- Use clear headings, bullet points and simple explanations.
+- Keep a neutral tone with no marketing language."""
 
 
 class BankBotAI:
@@ -22,47 +96,25 @@ class BankBotAI:
 
     def __init__(self):
         self.api_key = os.getenv("GEMINI_API_KEY")
-        self.base_url = "https://generativelanguage.googleapis.com/v1/models"
+        # v1beta: systemInstruction (see build_payload) is documented there
+        self.base_url = os.getenv(
+            "GEMINI_BASE_URL",
+            "https://generativelanguage.googleapis.com/v1beta/models"
+        )
         self.model = "gemini-2.5-flash"
+        self.client = GeminiClient(
+            pool_size=int(os.getenv("UPSTREAM_POOL_SIZE", "32")),
+            max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "2")),
+            hedge=os.getenv("UPSTREAM_HEDGE", "0") == "1",
+        )
+        self.sanitizer = ResponseSanitizer(FORBIDDEN_PHRASES)
 
     def get_enhanced_prompt(self, query):
-        return f"""You are **BankBot AI**, a neutral, brand-agnostic AI banking assistant.
-
-🚫 **ABSOLUTELY FORBIDDEN:**
-- NEVER mention ANY bank name
-- NEVER use "our bank", "we offer"
-- Use ONLY generic terms: "banks typically", "financial institutions"
-
-📌 **USER QUERY:** "{query}"
-
-🎯 **RESPONSE REQUIREMENTS:**
-• Clear headings
-• Bullet points
-• Simple explanations
-• Neutral tone
-• No marketing language
-
-⚠️ Final check: Ensure NO bank names exist.
-
-Now respond to: "{query}"
-"""
+        # The rules live in SYSTEM_INSTRUCTION; only the query varies
+        return query
 
     def sanitize_response(self, text):
-        if not text:
-            return text
-
-        forbidden_patterns = [
-            r'(?i)nexa\s+bank',
-            r'(?i)abc\s+bank',
-            r'(?i)xyz\s+bank',
-            r'(?i)our\s+bank',
-            r'(?i)we\s+offer',
-        ]
-
-        for pattern in forbidden_patterns:
-            text = re.sub(pattern, 'banks', text)
-
-        return text
+        return self.sanitizer.sanitize(text)
 
     def extract_text(self, data):
         """
@@ -84,42 +136,240 @@ Now respond to: "{query}"
 
         return None
 
-    def call_gemini_api(self, query):
+    def build_payload(self, query):
+        return {
+            "systemInstruction": {
+                "parts": [{"text": SYSTEM_INSTRUCTION}]
+            },
+            "contents": [{
+                "parts": [{"text": self.get_enhanced_prompt(query)}]
+            }],
+            "generationConfig": {
+                "temperature": 0.2,
+                "maxOutputTokens": 800
+            }
+        }
+
+    def call_gemini_api(self, query, client="unknown"):
+        """Returns (ok, text); only ok answers may be cached"""
         try:
             if not self.api_key:
-                return "GEMINI_API_KEY not configured."
+                return False, "GEMINI_API_KEY not configured."
 
             url = f"{self.base_url}/{self.model}:generateContent?key={self.api_key}"
 
-            payload = {
-                "contents": [{
-                    "parts": [{"text": self.get_enhanced_prompt(query)}]
-                }],
-                "generationConfig": {
-                    "temperature": 0.2,
-                    "maxOutputTokens": 800
-                }
-            }
-
-            response = requests.post(url, json=payload, timeout=15)
+            response = self.client.post(url, self.build_payload(query))
 
             if response.status_code == 200:
                 data = response.json()
+                ledger.record(client, parse_usage(data))
                 raw_text = self.extract_text(data)
 
                 if raw_text:
                     clean = self.sanitize_response(raw_text)
-                    return clean + "\n\n---\n*🤖 BankBot AI*"
+                    return True, clean + RESPONSE_FOOTER
 
-            return "AI response failed. Try again."
+            metrics.incr("upstream_errors")
+            if response.status_code == 429:
+                metrics.incr("upstream_429")
+            return False, "AI response failed. Try again."
 
         except Exception:
-            return "Temporary technical issue. Please retry."
+            metrics.incr("upstream_errors")
+            return False, "Temporary technical issue. Please retry."
+
+    def stream_gemini_api(self, query, client="unknown"):
+        """Yield sanitized text chunks from streamGenerateContent"""
+        if not self.api_key:
+            raise RuntimeError("GEMINI_API_KEY not configured.")
+
+        url = (f"{self.base_url}/{self.model}:streamGenerateContent"
+               f"?alt=sse&key={self.api_key}")
+
+        response = self.client.post(url, self.build_payload(query), stream=True)
+        # Holds back text that could be the start of a phrase split
+        # across two chunks
+        sanitizer = self.sanitizer.stream()
+        usage = None
+        try:
+            if response.status_code != 200:
+                raise RuntimeError(f"Gemini stream failed ({response.status_code})")
+
+            # chunk_size=None hands over each chunk as soon as it arrives
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                chunk = json.loads(line[5:])
+                # Running totals; the last chunk carries the final count
+                usage = parse_usage(chunk) or usage
+                text = self.extract_text(chunk)
+                if text:
+                    clean = sanitizer.feed(text)
+                    if clean:
+                        yield clean
+
+            tail = sanitizer.flush()
+            if tail:
+                yield tail
+        finally:
+            ledger.record(client, usage)
+            response.close()
 
 
 bankbot = BankBotAI()
 
 
+def record_request(outcome, start_time, upstream_ms=0.0):
+    """Count a request and split its latency into upstream vs local time"""
+    total_ms = (time.time() - start_time) * 1000
+    metrics.incr("requests_total")
+    metrics.incr(f"requests_{outcome}")
+    metrics.observe("total", total_ms)
+    if upstream_ms:
+        metrics.observe("upstream", upstream_ms)
+    metrics.observe("local_overhead", max(0.0, total_ms - upstream_ms))
+
+
+def client_address():
+    """Rate limit key: the caller's address, never a header it chooses"""
+    if TRUSTED_CLIENT_IP_HEADER:
+        forwarded = request.headers.get(TRUSTED_CLIENT_IP_HEADER, "")
+        address = forwarded.split(",")[-1].strip()
+        if address:
+            return address
+    return request.remote_addr or "unknown"
+
+
+def client_id():
+    """Label for token accounting; X-Client-Id is trusted for nothing else"""
+    return request.headers.get("X-Client-Id") or client_address()
+
+
+def rejected(e):
+    metrics.incr(f"admission_{e.reason}")
+    response = jsonify({
+        "response": "BankBot AI is busy right now. Please retry shortly.",
+        "error": e.reason,
+        "retry_after": e.retry_after
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+def response_meta(response_data, **extra):
+    """Everything but the text, for the final SSE event"""
+    meta = {k: v for k, v in response_data.items() if k != "response"}
+    meta.update(extra)
+    return meta
+
+
+def sse_event(data, event=None):
+    message = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
+
+
+def degraded_answer(prompt, start_time, fallback=DEGRADED_MESSAGE):
+    """Local FAQ answer used while Gemini is failing; never cached"""
+    text = local_answer(prompt)
+    metrics.incr("faq_answers" if text else "faq_misses")
+    return {
+        "response": text or fallback,
+        "model": "local-faq",
+        "response_time_ms": round((time.time() - start_time) * 1000, 2),
+        "source": "local-faq" if text else "unavailable",
+        "degraded": True
+    }
+
+
+def answer_from_gemini(prompt, prompt_hash, start_time, client="unknown",
+                       charge=None):
+    """Ask Gemini (at most once per prompt hash at a time) and cache it
+
+    Returns (response_data, shared, upstream_ms). Upstream time is the
+    wait for Gemini, whether our own call or the one we were coalesced onto.
+    Failed calls and open-breaker answers come from the local FAQ and are
+    not cached. charge runs only if this request makes the call, so
+    requests coalesced onto one already running cost no rate limit token.
+    """
+    def generate():
+        if not breaker.allow():
+            metrics.incr("breaker_short_circuits")
+            return degraded_answer(prompt, start_time)
+
+        try:
+            with admission.upstream_slot():
+                ok, response_text = bankbot.call_gemini_api(prompt, client)
+        except AdmissionRejected:
+            breaker.release()
+            raise
+
+        if not ok:
+            breaker.record_failure()
+            return degraded_answer(prompt, start_time, fallback=response_text)
+        breaker.record_success()
+
+        response_data = {
+            "response": response_text,
+            "model": "gemini-2.5-flash",
+            "response_time_ms": round((time.time() - start_time) * 1000, 2),
+            "source": "gemini-ai"
+        }
+
+        response_cache.set(prompt_hash, response_data)
+        return response_data
+
+    upstream_start = time.time()
+    response_data, shared = inflight.do(prompt_hash, generate, before=charge)
+    upstream_ms = (time.time() - upstream_start) * 1000
+
+    if shared:
+        response_data = dict(
+            response_data,
+            response_time_ms=round((time.time() - start_time) * 1000, 2)
+        )
+
+    return response_data, shared, upstream_ms
+
+
+def refresh_entry(prompt, prompt_hash, client):
+    try:
+        response_data, _, _ = answer_from_gemini(prompt, prompt_hash, time.time(), client)
+        # Failed refreshes are not cached; the stale copy stays until max age
+        metrics.incr("cache_refresh_failed" if response_data.get("degraded")
+                     else "cache_refreshed")
+    except AdmissionRejected:
+        metrics.incr("cache_refresh_failed")
+    finally:
+        with refreshing_lock:
+            refreshing.discard(prompt_hash)
+
+
+def cached_answer(prompt, prompt_hash, client="unknown"):
+    """Cached response for the prompt, or None
+
+    A stale entry (inside the grace window) is returned as is and one
+    background refresh is queued for it.
+    """
+    hit = response_cache.lookup(prompt_hash)
+    if hit is None:
+        return None
+
+    data, stale = hit
+    if stale:
+        metrics.incr("cache_stale_served")
+        with refreshing_lock:
+            start = prompt_hash not in refreshing
+            if start:
+                refreshing.add(prompt_hash)
+        if start:
+            metrics.incr("cache_refresh_started")
+            refresher.submit(refresh_entry, prompt, prompt_hash, client)
+    return data
+
+
 @app.route("/api/chat", methods=["POST"])
 def chat():
     start_time = time.time()
@@ -130,30 +380,298 @@ def chat():
     if not prompt:
         return jsonify({"response": "Enter your question."})
 
-    prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
-
-    if prompt_hash in response_cache:
-        cached = response_cache[prompt_hash]
-        if time.time() - cached["timestamp"] < CACHE_TIMEOUT:
-            return jsonify(cached["data"])
+    # Near-identical wordings of the same question share one entry
+    prompt_hash = cache_key(prompt)
+    client = client_id()
+
+    cached = cached_answer(prompt, prompt_hash, client)
+    if cached is not None:
+        record_request("cache_hit", start_time)
+        return jsonify(cached)
+
+    address = client_address()
+    try:
+        response_data, shared, upstream_ms = answer_from_gemini(
+            prompt, prompt_hash, start_time, client,
+            charge=lambda: admission.check_rate(address)
+        )
+    except AdmissionRejected as e:
+        return rejected(e)
+
+    if response_data.get("degraded"):
+        outcome = "degraded"
+    else:
+        outcome = "coalesced" if shared else "upstream"
+    record_request(outcome, start_time, upstream_ms)
+    return jsonify(response_data)
 
-    response_text = bankbot.call_gemini_api(prompt)
 
-    response_time = round((time.time() - start_time) * 1000, 2)
+@app.route("/api/chat/batch", methods=["POST"])
+def chat_batch():
+    """Answer a list of prompts; duplicates and cached prompts cost nothing"""
+    start_time = time.time()
 
-    response_data = {
-        "response": response_text,
-        "model": "gemini-2.5-flash",
-        "response_time_ms": response_time,
-        "source": "gemini-ai"
-    }
+    data = request.get_json(silent=True) or {}
+    prompts = data.get("prompts")
+    if not isinstance(prompts, list) or not prompts:
+        return jsonify({"error": "prompts must be a non-empty list"}), 400
+    if len(prompts) > BATCH_MAX_PROMPTS:
+        return jsonify({"error": f"At most {BATCH_MAX_PROMPTS} prompts per batch"}), 400
+
+    try:
+        concurrency = int(data.get("concurrency", BATCH_MAX_CONCURRENCY))
+    except (TypeError, ValueError):
+        concurrency = BATCH_MAX_CONCURRENCY
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+
+    # One slot per distinct canonical prompt, in first-seen order
+    items = []
+    unique = {}
+    for raw in prompts:
+        prompt = str(raw or "").strip()[:250]
+        prompt_hash = cache_key(prompt) if prompt else None
+        items.append((prompt, prompt_hash))
+        if prompt_hash and prompt_hash not in unique:
+            unique[prompt_hash] = prompt
+
+    client = client_id()
+
+    results = {}
+    pending = []
+    for prompt_hash, prompt in unique.items():
+        lookup_start = time.time()
+        cached = cached_answer(prompt, prompt_hash, client)
+        if cached is not None:
+            results[prompt_hash] = dict(
+                cached,
+                cached=True,
+                response_time_ms=round((time.time() - lookup_start) * 1000, 2)
+            )
+        else:
+            pending.append((prompt_hash, prompt))
+    cached_count = len(unique) - len(pending)
+    limited_count = 0
+
+    def fetch(entry):
+        prompt_hash, prompt = entry
+        item_start = time.time()
+        try:
+            response_data, _, _ = answer_from_gemini(
+                prompt, prompt_hash, item_start, client
+            )
+        except AdmissionRejected as e:
+            return prompt_hash, {"error": e.reason, "retry_after": e.retry_after,
+                                 "cached": False}
+        return prompt_hash, dict(response_data, cached=False)
+
+    if pending:
+        # One token per Gemini call from the client's batch budget (not
+        # its chat one); prompts past the remaining tokens are answered
+        # rate_limited. The fan-out is held to the global cap.
+        try:
+            allowed, wait = admission.check_rate(client_address(), len(pending),
+                                                 limit="batch")
+        except AdmissionRejected as e:
+            return rejected(e)
+        if allowed < len(pending):
+            limited = AdmissionRejected("rate_limited", wait)
+            metrics.incr("admission_rate_limited")
+            for prompt_hash, _ in pending[allowed:]:
+                results[prompt_hash] = {"error": limited.reason,
+                                        "retry_after": limited.retry_after,
+                                        "cached": False}
+            limited_count = len(pending) - allowed
+            pending = pending[:allowed]
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(pending))) as pool:
+            for prompt_hash, result in pool.map(fetch, pending):
+                results[prompt_hash] = result
+
+    responses = []
+    for prompt, prompt_hash in items:
+        if not prompt_hash:
+            responses.append({"prompt": prompt, "response": "Enter your question."})
+        else:
+            responses.append(dict(results[prompt_hash], prompt=prompt))
+
+    metrics.incr("batch_requests")
+    metrics.incr("batch_prompts", len(prompts))
+    metrics.incr("batch_upstream_calls", len(pending))
+
+    return jsonify({
+        "results": responses,
+        "count": len(responses),
+        "unique": len(unique),
+        "cached": cached_count,
+        "rate_limited": limited_count,
+        "upstream_calls": len(pending),
+        "concurrency": concurrency,
+        "total_time_ms": round((time.time() - start_time) * 1000, 2)
+    })
+
+
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """Same request as /api/chat, answered as server-sent events"""
+    start_time = time.time()
 
-    response_cache[prompt_hash] = {
-        "data": response_data,
-        "timestamp": time.time()
-    }
+    data = request.get_json(silent=True) or {}
+    prompt = data.get("prompt", "").strip()[:250]
+    prompt_hash = cache_key(prompt) if prompt else None
+    client = client_id()
+    cached = cached_answer(prompt, prompt_hash, client) if prompt else None
 
-    return jsonify(response_data)
+    # Rate limits are checked before the 200 starts streaming so a
+    # rejected client gets a real 429
+    if prompt and cached is None:
+        try:
+            admission.check_rate(client_address())
+        except AdmissionRejected as e:
+            return rejected(e)
+
+    def generate():
+        if not prompt:
+            yield sse_event({"text": "Enter your question."})
+            yield sse_event({"source": "validation"}, event="done")
+            return
+
+        metrics.incr("stream_requests")
+        if cached is not None:
+            metrics.observe("stream_ttft", (time.time() - start_time) * 1000)
+            yield sse_event({"text": cached["response"]})
+            yield sse_event(response_meta(
+                cached,
+                cached=True,
+                ttft_ms=round((time.time() - start_time) * 1000, 2)
+            ), event="done")
+            return
+
+        def answer_locally():
+            response_data = degraded_answer(prompt, start_time)
+            yield sse_event({"text": response_data["response"]})
+            yield sse_event(response_meta(response_data), event="done")
+
+        if not breaker.allow():
+            metrics.incr("breaker_short_circuits")
+            yield from answer_locally()
+            return
+
+        parts = []
+        ttft_ms = None
+        try:
+            with admission.upstream_slot():
+                for chunk in bankbot.stream_gemini_api(prompt, client):
+                    if ttft_ms is None:
+                        ttft_ms = round((time.time() - start_time) * 1000, 2)
+                        metrics.observe("stream_ttft", ttft_ms)
+                    parts.append(chunk)
+                    yield sse_event({"text": chunk})
+        except AdmissionRejected as e:
+            breaker.release()
+            metrics.incr(f"admission_{e.reason}")
+            yield sse_event({"error": "BankBot AI is busy right now. Please retry shortly.",
+                             "retry_after": e.retry_after}, event="error")
+            return
+        except GeneratorExit:
+            # Client disconnected mid-stream; says nothing about Gemini
+            breaker.release()
+            raise
+        except Exception:
+            metrics.incr("upstream_errors")
+            breaker.record_failure()
+            if not parts:
+                # Nothing sent yet, so the local FAQ can still answer
+                yield from answer_locally()
+                return
+            yield sse_event({"error": "Temporary technical issue. Please retry."},
+                            event="error")
+            return
+
+        if not parts:
+            breaker.record_failure()
+            yield from answer_locally()
+            return
+        breaker.record_success()
+
+        yield sse_event({"text": RESPONSE_FOOTER})
+
+        response_data = {
+            "response": "".join(parts) + RESPONSE_FOOTER,
+            "model": "gemini-2.5-flash",
+            "response_time_ms": round((time.time() - start_time) * 1000, 2),
+            "source": "gemini-ai"
+        }
+        # A finished stream serves later /api/chat and stream requests
+        response_cache.set(prompt_hash, response_data)
+
+        yield sse_event(response_meta(response_data, ttft_ms=ttft_ms),
+                        event="done")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    upstream = bankbot.client.stats()
+    return jsonify({
+        "uptime_s": snapshot["uptime_s"],
+        "requests": {
+            "total": counters.get("requests_total", 0),
+            "cache_hits": counters.get("requests_cache_hit", 0),
+            "coalesced": counters.get("requests_coalesced", 0),
+            "upstream": counters.get("requests_upstream", 0),
+            "degraded": counters.get("requests_degraded", 0),
+            "stream": counters.get("stream_requests", 0),
+        },
+        "cache_hit_ratio": response_cache.stats()["hit_ratio"],
+        "latency_ms": snapshot["latency_ms"],
+        "upstream": {
+            "errors": counters.get("upstream_errors", 0),
+            "http_429": counters.get("upstream_429", 0),
+            # Per attempt, including ones a retry later recovered from
+            "attempts": upstream["requests_sent"],
+            "attempt_status_counts": upstream["status_counts"],
+            "attempt_network_errors": upstream["network_errors"],
+        },
+        "cache": {
+            "stale_served": counters.get("cache_stale_served", 0),
+            "refresh_started": counters.get("cache_refresh_started", 0),
+            "refreshed": counters.get("cache_refreshed", 0),
+            "refresh_failed": counters.get("cache_refresh_failed", 0),
+        },
+        "breaker": dict(
+            breaker.stats(),
+            faq_answers=counters.get("faq_answers", 0),
+            faq_misses=counters.get("faq_misses", 0),
+        ),
+    })
+
+
+@app.route("/api/usage", methods=["GET"])
+def usage():
+    """Gemini token usage from usageMetadata, per hour and per client"""
+    return jsonify(ledger.snapshot())
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    return jsonify({
+        "status": "ok",
+        "ai_engine": bankbot.model,
+        "api_key_configured": bool(bankbot.api_key),
+        "cache_size": len(response_cache),
+        "cache": response_cache.stats(),
+        "inflight": inflight.stats(),
+        "upstream": bankbot.client.stats(),
+        "admission": admission.stats(),
+        "breaker": breaker.stats()
+    })
 
 
 if __name__ == "__main__":
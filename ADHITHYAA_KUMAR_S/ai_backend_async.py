@@ -0,0 +1,203 @@
+# ai_backend_async.py - BANKBOT AI - async (ASGI) serving mode
+#
+# Same /api/chat and /health contract as ai_backend.py, but every request
+# is a coroutine waiting on an async HTTP client instead of an OS thread
+# blocked in requests.post. Rate limits, the upstream cap and token
+# accounting are the same objects as ai_backend.py's, configured by the
+# same environment variables. Run with:
+#   python ai_backend_async.py
+#   hypercorn ai_backend_async:app --bind 0.0.0.0:5000
+import asyncio
+import os
+import time
+
+import aiohttp
+from quart import Quart, request, jsonify
+
+from admission import AdmissionRejected
+from ai_backend import (bankbot, response_cache, breaker, degraded_answer,
+                        admission, ledger, TRUSTED_CLIENT_IP_HEADER, RESPONSE_FOOTER)
+from canonicalize import cache_key
+from token_ledger import parse_usage
+
+app = Quart(__name__)
+
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "500"))
+
+session = None
+inflight = {}  # prompt hash -> Future shared by identical concurrent requests
+stats = {"upstream_calls": 0, "upstream_calls_saved": 0}
+
+
+@app.before_serving
+async def start_session():
+    global session
+    session = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=15, connect=3.05),
+        connector=aiohttp.TCPConnector(limit=UPSTREAM_MAX_CONNECTIONS),
+    )
+
+
+@app.after_serving
+async def close_session():
+    await session.close()
+
+
+@app.after_request
+async def add_cors_headers(response):
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    return response
+
+
+def client_address():
+    """Rate limit key: the caller's address, never a header it chooses"""
+    if TRUSTED_CLIENT_IP_HEADER:
+        forwarded = request.headers.get(TRUSTED_CLIENT_IP_HEADER, "")
+        address = forwarded.split(",")[-1].strip()
+        if address:
+            return address
+    return request.remote_addr or "unknown"
+
+
+def client_id():
+    """Label for token accounting; X-Client-Id is trusted for nothing else"""
+    return request.headers.get("X-Client-Id") or client_address()
+
+
+def rejected(e):
+    response = jsonify({
+        "response": "BankBot AI is busy right now. Please retry shortly.",
+        "error": e.reason,
+        "retry_after": e.retry_after
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+async def call_gemini_api(query, client="unknown"):
+    """Returns (ok, text); only ok answers may be cached"""
+    if not bankbot.api_key:
+        return False, "GEMINI_API_KEY not configured."
+
+    url = f"{bankbot.base_url}/{bankbot.model}:generateContent?key={bankbot.api_key}"
+
+    try:
+        async with session.post(url, json=bankbot.build_payload(query)) as response:
+            if response.status == 200:
+                data = await response.json()
+                ledger.record(client, parse_usage(data))
+                raw_text = bankbot.extract_text(data)
+
+                if raw_text:
+                    return True, bankbot.sanitize_response(raw_text) + RESPONSE_FOOTER
+
+        return False, "AI response failed. Try again."
+
+    except Exception:
+        return False, "Temporary technical issue. Please retry."
+
+
+async def generate(prompt, prompt_hash, start_time, client):
+    if not breaker.allow():
+        return degraded_answer(prompt, start_time)
+
+    try:
+        async with admission.upstream_slot_async():
+            ok, response_text = await call_gemini_api(prompt, client)
+    except (asyncio.CancelledError, AdmissionRejected):
+        breaker.release()
+        raise
+
+    if not ok:
+        breaker.record_failure()
+        return degraded_answer(prompt, start_time, fallback=response_text)
+    breaker.record_success()
+
+    response_data = {
+        "response": response_text,
+        "model": "gemini-2.5-flash",
+        "response_time_ms": round((time.time() - start_time) * 1000, 2),
+        "source": "gemini-ai"
+    }
+
+    response_cache.set(prompt_hash, response_data)
+    return response_data
+
+
+@app.route("/api/chat", methods=["POST"])
+async def chat():
+    start_time = time.time()
+
+    data = await request.get_json(silent=True) or {}
+    prompt = data.get("prompt", "").strip()[:250]
+
+    if not prompt:
+        return jsonify({"response": "Enter your question."})
+
+    prompt_hash = cache_key(prompt)
+
+    cached = response_cache.get(prompt_hash)
+    if cached is not None:
+        return jsonify(cached)
+
+    # Single-flight: identical prompts await the call already running
+    future = inflight.get(prompt_hash)
+    if future is not None:
+        stats["upstream_calls_saved"] += 1
+        try:
+            response_data = await asyncio.shield(future)
+        except AdmissionRejected as e:
+            return rejected(e)
+        return jsonify(dict(
+            response_data,
+            response_time_ms=round((time.time() - start_time) * 1000, 2)
+        ))
+
+    # Only the request that makes the call spends a rate limit token
+    try:
+        admission.check_rate(client_address())
+    except AdmissionRejected as e:
+        return rejected(e)
+
+    stats["upstream_calls"] += 1
+    future = asyncio.ensure_future(generate(prompt, prompt_hash, start_time, client_id()))
+    inflight[prompt_hash] = future
+    future.add_done_callback(lambda _: inflight.pop(prompt_hash, None))
+
+    try:
+        return jsonify(await asyncio.shield(future))
+    except AdmissionRejected as e:
+        return rejected(e)
+
+
+@app.route("/health", methods=["GET"])
+async def health():
+    return jsonify({
+        "status": "ok",
+        "ai_engine": bankbot.model,
+        "api_key_configured": bool(bankbot.api_key),
+        "serving_mode": "async",
+        "cache_size": len(response_cache),
+        "cache": response_cache.stats(),
+        "inflight": dict(stats, in_flight=len(inflight)),
+        "breaker": breaker.stats(),
+        "admission": admission.stats()
+    })
+
+
+@app.route("/api/usage", methods=["GET"])
+async def usage():
+    """Gemini token usage from usageMetadata, per hour and per client"""
+    return jsonify(ledger.snapshot())
+
+
+if __name__ == "__main__":
+    print("🤖 BANKBOT AI v5.0 - GEMINI 2.5 FLASH (async mode)")
+    if not os.getenv("GEMINI_API_KEY"):
+        print("❌ GEMINI_API_KEY missing")
+    else:
+        print("✅ Gemini API Ready")
+
+    app.run(host="0.0.0.0", port=5000, debug=False)
@@ -155,14 +155,40 @@ Status: Production Ready
     # Performance Monitor
     st.subheader("⚡ Performance")
     
-    # Simulated metrics
-    metric_col1, metric_col2, metric_col3 = st.columns(3)
-    with metric_col1:
-        st.metric("Response", "< 2s")
-    with metric_col2:
-        st.metric("Uptime", "99.9%")
-    with metric_col3:
-        st.metric("Today", "0")
+    # Live metrics from the backend's /metrics endpoint
+    try:
+        perf = requests.get("http://localhost:5000/metrics", timeout=2).json()
+    except Exception:
+        perf = None
+
+    if perf:
+        total = perf["latency_ms"].get("total", {})
+        upstream = perf["latency_ms"].get("upstream", {})
+        errors = perf["upstream"]
+
+        metric_col1, metric_col2, metric_col3 = st.columns(3)
+        with metric_col1:
+            st.metric("p50", f"{total.get('p50', 0):.0f} ms")
+        with metric_col2:
+            st.metric("p95", f"{total.get('p95', 0):.0f} ms")
+        with metric_col3:
+            st.metric("p99", f"{total.get('p99', 0):.0f} ms")
+
+        metric_col1, metric_col2, metric_col3 = st.columns(3)
+        with metric_col1:
+            st.metric("Requests", perf["requests"]["total"])
+        with metric_col2:
+            st.metric("Cache hits", f"{perf['cache_hit_ratio']:.0%}")
+        with metric_col3:
+            st.metric("Errors", errors["errors"], help=f"429s: {errors['http_429']}")
+
+        st.caption(
+            f"Gemini p95 {upstream.get('p95', 0):.0f} ms • "
+            f"local p95 {perf['latency_ms'].get('local_overhead', {}).get('p95', 0):.1f} ms • "
+            f"up {perf['uptime_s'] / 60:.0f} min"
+        )
+    else:
+        st.caption("Metrics unavailable - backend offline")
     
     st.markdown("---")
     
@@ -0,0 +1,71 @@
+# bench_canonicalize.py - replay prompts and compare cache hit ratios
+#
+# Usage:
+#   python bench_canonicalize.py                 # built-in FAQ sample
+#   python bench_canonicalize.py prompts.txt     # one prompt per line
+import hashlib
+import sys
+
+from canonicalize import cache_key
+
+# Typical FAQ traffic: a few questions typed slightly differently
+SAMPLE_PROMPTS = [
+    "What is EMI?", "what is emi", "What is  EMI ?", "what's an EMI",
+    "What is equated monthly installment?", "What is EMI",
+    "How do I open a savings account?", "how do i open a savings account",
+    "How do I open a saving account", "how do I open savings account?",
+    "What are FD interest rates?", "what are fixed deposit interest rates",
+    "FD interest rates?", "What are the FD interest rates",
+    "How to apply for a credit card", "how to apply for credit card?",
+    "How to apply for a credit card?!", "How to apply for credit cards",
+    "What is KYC?", "what is kyc", "What is Know Your Customer?",
+    "How do I reset my net banking password?",
+    "how do i reset my internet banking password",
+    "How do I reset my online banking password?",
+    "How to block a lost debit card?", "how to block lost debit card",
+    "How to request a cheque book?", "how to request cheque book",
+    "How to request a check book", "What is a recurring deposit?",
+    "what is RD", "What is a Recurring Deposit", "What is EMI?",
+    "How do I open a savings account?", "What are FD interest rates?",
+]
+
+
+def replay(prompts, key_fn):
+    seen = set()
+    hits = 0
+    for prompt in prompts:
+        prompt = prompt.strip()[:250]
+        if not prompt:
+            continue
+        key = key_fn(prompt)
+        if key in seen:
+            hits += 1
+        seen.add(key)
+    return hits, len(seen)
+
+
+def raw_key(prompt):
+    return hashlib.md5(prompt.encode()).hexdigest()
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            prompts = [line for line in f if line.strip()]
+    else:
+        prompts = SAMPLE_PROMPTS
+
+    total = len(prompts) or 1
+    raw_hits, raw_keys = replay(prompts, raw_key)
+    canon_hits, canon_keys = replay(prompts, cache_key)
+
+    print("=" * 60)
+    print(f"Replayed prompts:        {total}")
+    print(f"Raw keys:                {raw_keys:5d}  hit ratio {raw_hits / total:.1%}")
+    print(f"Canonical keys:          {canon_keys:5d}  hit ratio {canon_hits / total:.1%}")
+    print(f"Gemini calls saved:      {canon_hits - raw_hits}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# bench_concurrency.py - threaded Flask vs async serving under slow upstream calls
+#
+# Starts the local Gemini stub, then each backend in turn on port 5000,
+# fires N concurrent /api/chat requests with distinct prompts (so the
+# cache can't help) and reports throughput, latency and server footprint.
+#
+# Usage:
+#   python bench_concurrency.py --concurrency 300 --latency 2
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import aiohttp
+import requests
+
+import gemini_stub
+
+BACKEND_URL = "http://127.0.0.1:5000"
+MODES = {
+    "threaded": "ai_backend.py",
+    "async": "ai_backend_async.py",
+}
+
+# The benchmark is one client firing everything at once; lift the
+# per-client rate limit and admission caps so they aren't what we measure
+UNTHROTTLED_ENV = {
+    "RATE_LIMIT_PER_MIN": "1000000",
+    "RATE_LIMIT_BURST": "1000000",
+    "UPSTREAM_MAX_CONCURRENT": "100000",
+    "ADMISSION_QUEUE_SIZE": "100000",
+}
+
+
+def read_proc_status(pid):
+    """(rss_mb, threads) from /proc - Linux only"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["Threads"])
+    except (OSError, KeyError, ValueError):
+        return 0.0, 0
+
+
+def wait_for_backend(timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{BACKEND_URL}/health", timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+async def fire(concurrency, run_id):
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+        async def one(i):
+            start = time.perf_counter()
+            try:
+                async with client.post(
+                    f"{BACKEND_URL}/api/chat",
+                    json={"prompt": f"Benchmark question {run_id}-{i}"}
+                ) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ok = False
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(concurrency)))
+        return results, time.perf_counter() - start
+
+
+def run_mode(mode, script, concurrency, upstream_url):
+    env = dict(os.environ, **UNTHROTTLED_ENV)
+    env.update(GEMINI_BASE_URL=upstream_url,
+               GEMINI_API_KEY=os.getenv("GEMINI_API_KEY") or "bench")
+    proc = subprocess.Popen([sys.executable, script], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    peak = {"rss_mb": 0.0, "threads": 0}
+    stop = threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            rss, threads = read_proc_status(proc.pid)
+            peak["rss_mb"] = max(peak["rss_mb"], rss)
+            peak["threads"] = max(peak["threads"], threads)
+            time.sleep(0.05)
+
+    try:
+        if not wait_for_backend():
+            print(f"❌ {mode}: backend did not start")
+            return None
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        results, elapsed = asyncio.run(fire(concurrency, mode))
+        stop.set()
+        sampler.join()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = sorted(t for ok, t in results if ok)
+    ok_count = len(latencies)
+
+    def pct(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(ok_count - 1, int(ok_count * p))] * 1000
+
+    return {
+        "mode": mode,
+        "ok": ok_count,
+        "failed": len(results) - ok_count,
+        "elapsed_s": elapsed,
+        "rps": ok_count / elapsed if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "peak_rss_mb": peak["rss_mb"],
+        "peak_threads": peak["threads"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=2.0,
+                        help="stub upstream latency in seconds")
+    parser.add_argument("--stub-port", type=int, default=8089)
+    parser.add_argument("--modes", nargs="+", default=list(MODES))
+    args = parser.parse_args()
+
+    gemini_stub.serve(args.stub_port, args.latency)
+    upstream_url = f"http://127.0.0.1:{args.stub_port}/v1beta/models"
+
+    rows = []
+    for mode in args.modes:
+        print(f"⏱️  {mode}: {args.concurrency} concurrent requests ...")
+        row = run_mode(mode, MODES[mode], args.concurrency, upstream_url)
+        if row:
+            rows.append(row)
+
+    print("=" * 86)
+    print(f"{'mode':10} {'ok':>5} {'fail':>5} {'wall s':>8} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'threads':>8}")
+    for r in rows:
+        print(f"{r['mode']:10} {r['ok']:5d} {r['failed']:5d} {r['elapsed_s']:8.2f} "
+              f"{r['rps']:8.1f} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} "
+              f"{r['peak_rss_mb']:8.1f} {r['peak_threads']:8d}")
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
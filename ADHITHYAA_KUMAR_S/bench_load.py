@@ -0,0 +1,245 @@
+# bench_load.py - offline load test of /api/chat against the local Gemini stub
+#
+# Starts gemini_stub.py and ai_backend.py as subprocesses (no API key or
+# network needed), then keeps --concurrency requests in flight until
+# --requests have been sent. Prompts are drawn from --unique distinct
+# questions with a Zipf-like skew, like FAQ traffic, so the cache matters.
+# Reports throughput, latency percentiles, status codes, cache hit ratio
+# and upstream calls; --json prints the same as one JSON object for CI.
+#
+# Usage:
+#   python bench_load.py --requests 2000 --concurrency 50
+#   python bench_load.py --latency 1 --error-rate 0.05 --rate-429 0.02
+#   python bench_load.py --url http://127.0.0.1:5000   # already running
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import aiohttp
+import requests
+
+from bench_concurrency import BACKEND_URL, wait_for_backend, read_proc_status
+
+# The driver is a single client; without this it would just measure the
+# per-client rate limit. Admission caps stay as configured.
+BACKEND_ENV = {
+    "RATE_LIMIT_PER_MIN": "1000000",
+    "RATE_LIMIT_BURST": "1000000",
+}
+
+
+def make_workload(total, unique, skew, seed):
+    """Prompts for the run: rank r is picked with weight 1 / r**skew"""
+    rng = random.Random(seed)
+    prompts = [f"Load test question number {i}" for i in range(unique)]
+    weights = [1 / (rank + 1) ** skew for rank in range(unique)]
+    return rng.choices(prompts, weights=weights, k=total)
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.post(f"http://127.0.0.1:{port}/", timeout=1)
+            return True
+        except requests.RequestException:
+            time.sleep(0.1)
+    return False
+
+
+def start_stub(args):
+    proc = subprocess.Popen(
+        [sys.executable, "gemini_stub.py",
+         "--port", str(args.stub_port),
+         "--latency", str(args.latency),
+         "--jitter", str(args.jitter),
+         "--error-rate", str(args.error_rate),
+         "--rate-429", str(args.rate_429),
+         "--output-chars", str(args.output_chars)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    if not wait_for_port(args.stub_port):
+        proc.terminate()
+        raise SystemExit("❌ Gemini stub did not start")
+    return proc
+
+
+def start_backend(args):
+    env = dict(os.environ, **BACKEND_ENV)
+    env.update(dict(kv.split("=", 1) for kv in args.backend_env))
+    env["GEMINI_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}/v1beta/models"
+    env["GEMINI_API_KEY"] = "load-test"
+    proc = subprocess.Popen([sys.executable, "ai_backend.py"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_backend():
+        proc.terminate()
+        raise SystemExit("❌ backend did not start")
+    return proc
+
+
+def server_metrics(url):
+    try:
+        return requests.get(f"{url}/metrics", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+async def drive(url, prompts, concurrency):
+    """Closed loop: each worker sends its next request when the last returns"""
+    queue = iter(enumerate(prompts))
+    results = [None] * len(prompts)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+        async def worker():
+            for i, prompt in queue:
+                start = time.perf_counter()
+                source = None
+                try:
+                    async with client.post(f"{url}/api/chat",
+                                           json={"prompt": prompt}) as response:
+                        status = response.status
+                        if status == 200:
+                            source = (await response.json()).get("source")
+                        else:
+                            await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    status = "error"
+                results[i] = (status, source, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results, time.perf_counter() - start
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def summarize(results, elapsed, before, after):
+    latencies = sorted(t * 1000 for status, _, t in results if status == 200)
+    statuses, sources = {}, {}
+    for status, source, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if source:
+            sources[source] = sources.get(source, 0) + 1
+
+    report = {
+        "requests": len(results),
+        "ok": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p90": round(percentile(latencies, 0.90), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+        },
+        "status_counts": statuses,
+        "sources": sources,
+    }
+
+    if before and after:
+        # Deltas, so a backend that was already warm is measured fairly
+        def delta(section, key):
+            return after[section].get(key, 0) - before[section].get(key, 0)
+
+        total = delta("requests", "total")
+        hits = delta("requests", "cache_hits")
+        report["server"] = {
+            "cache_hit_ratio": round(hits / total, 4) if total else 0.0,
+            "cache_hits": hits,
+            "coalesced": delta("requests", "coalesced"),
+            "upstream_requests": delta("requests", "upstream"),
+            "degraded": delta("requests", "degraded"),
+            "upstream_attempts": delta("upstream", "attempts"),
+            "upstream_errors": delta("upstream", "errors"),
+        }
+    return report
+
+
+def print_report(report, args):
+    print("=" * 60)
+    print(f"requests       {report['requests']} "
+          f"(concurrency {args.concurrency}, {args.unique} unique prompts)")
+    print(f"ok             {report['ok']}")
+    print(f"elapsed        {report['elapsed_s']:.2f} s")
+    print(f"throughput     {report['throughput_rps']:.1f} req/s")
+    lat = report["latency_ms"]
+    print(f"latency ms     p50 {lat['p50']:.1f}  p90 {lat['p90']:.1f}  "
+          f"p99 {lat['p99']:.1f}  max {lat['max']:.1f}")
+    print(f"status codes   {report['status_counts']}")
+    print(f"sources        {report['sources']}")
+    server = report.get("server")
+    if server:
+        print(f"cache hits     {server['cache_hits']} "
+              f"({server['cache_hit_ratio']:.1%})")
+        print(f"coalesced      {server['coalesced']}")
+        print(f"degraded       {server['degraded']}")
+        print(f"upstream       {server['upstream_requests']} requests, "
+              f"{server['upstream_attempts']} attempts, "
+              f"{server['upstream_errors']} errors")
+    if "backend_rss_mb" in report:
+        print(f"backend        {report['backend_rss_mb']:.1f} MB RSS at the end")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /api/chat load test")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--unique", type=int, default=100,
+                        help="distinct prompts in the workload")
+    parser.add_argument("--skew", type=float, default=1.1,
+                        help="Zipf exponent; 0 makes every prompt equally likely")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="use an already running backend")
+    parser.add_argument("--backend-env", action="append", default=[],
+                        metavar="KEY=VALUE", help="extra env for the backend")
+    stub = parser.add_argument_group("Gemini stub")
+    stub.add_argument("--stub-port", type=int, default=8089)
+    stub.add_argument("--latency", type=float, default=0.5)
+    stub.add_argument("--jitter", type=float, default=0.1)
+    stub.add_argument("--error-rate", type=float, default=0.0)
+    stub.add_argument("--rate-429", type=float, default=0.0)
+    stub.add_argument("--output-chars", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = parser.parse_args()
+
+    prompts = make_workload(args.requests, args.unique, args.skew, args.seed)
+
+    procs = []
+    url = args.url or BACKEND_URL
+    try:
+        if not args.url:
+            procs.append(start_stub(args))
+            procs.append(start_backend(args))
+
+        before = server_metrics(url)
+        results, elapsed = asyncio.run(drive(url, prompts, args.concurrency))
+        after = server_metrics(url)
+
+        report = summarize(results, elapsed, before, after)
+        if not args.url:
+            report["backend_rss_mb"] = round(read_proc_status(procs[-1].pid)[0], 1)
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args)
+
+
+if __name__ == "__main__":
+    main()
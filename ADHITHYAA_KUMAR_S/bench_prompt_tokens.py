@@ -0,0 +1,113 @@
+# bench_prompt_tokens.py - input tokens and latency: old wrapped prompt vs systemInstruction
+#
+# Offline (default) estimates tokens at ~4 chars/token and compares
+# request payload sizes. With --live and GEMINI_API_KEY set, each payload
+# is sent to Gemini and the real usageMetadata and latency are reported.
+#
+# Usage:
+#   python bench_prompt_tokens.py
+#   python bench_prompt_tokens.py --live --rounds 3
+import argparse
+import json
+import os
+import statistics
+import time
+
+import requests
+from dotenv import load_dotenv
+
+from ai_backend import bankbot
+from gemini_stub import prompt_tokens
+
+QUERIES = [
+    "What is EMI?",
+    "How do I open a savings account?",
+    "What documents are needed for KYC?",
+    "How is interest on a fixed deposit calculated?",
+    "What is the difference between NEFT, RTGS and IMPS?",
+]
+
+
+def legacy_payload(query):
+    """generateContent body as it was built before systemInstruction"""
+    prompt = f"""You are **BankBot AI**, a neutral, brand-agnostic AI banking assistant.
+
+🚫 **ABSOLUTELY FORBIDDEN:**
+- NEVER mention ANY bank name
+- NEVER use "our bank", "we offer"
+- Use ONLY generic terms: "banks typically", "financial institutions"
+
+📌 **USER QUERY:** "{query}"
+
+🎯 **RESPONSE REQUIREMENTS:**
+• Clear headings
+• Bullet points
+• Simple explanations
+• Neutral tone
+• No marketing language
+
+⚠️ Final check: Ensure NO bank names exist.
+
+Now respond to: "{query}"
+"""
+    return {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": 0.2, "maxOutputTokens": 800}
+    }
+
+
+def live_run(payload, url):
+    start = time.time()
+    response = requests.post(url, json=payload, timeout=30)
+    elapsed = (time.time() - start) * 1000
+    usage = response.json().get("usageMetadata", {}) if response.ok else {}
+    return usage.get("promptTokenCount", 0), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--rounds", type=int, default=1)
+    args = parser.parse_args()
+
+    variants = {"before": legacy_payload, "after": bankbot.build_payload}
+    rows = {}
+
+    if args.live:
+        load_dotenv()
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            print("❌ GEMINI_API_KEY missing")
+            return
+        url = f"{bankbot.base_url}/{bankbot.model}:generateContent?key={api_key}"
+        for name, build in variants.items():
+            tokens, latencies = [], []
+            for _ in range(args.rounds):
+                for query in QUERIES:
+                    count, ms = live_run(build(query), url)
+                    tokens.append(count)
+                    latencies.append(ms)
+            rows[name] = (statistics.mean(tokens), statistics.median(latencies))
+    else:
+        for name, build in variants.items():
+            payloads = [build(q) for q in QUERIES]
+            rows[name] = (
+                statistics.mean(prompt_tokens(p) for p in payloads),
+                statistics.mean(len(json.dumps(p).encode()) for p in payloads),
+            )
+
+    second = "median ms" if args.live else "payload B"
+    print("=" * 52)
+    print(f"{'':10}{'prompt tokens':>18}{second:>18}")
+    for name, (tokens, other) in rows.items():
+        print(f"{name:10}{tokens:18.1f}{other:18.1f}")
+    before, after = rows["before"][0], rows["after"][0]
+    if before:
+        print(f"saved {before - after:.1f} prompt tokens per request "
+              f"({(before - after) / before:.0%})"
+              + ("" if args.live else " - estimated at ~4 chars/token"))
+    print("=" * 52)
+
+
+if __name__ == "__main__":
+    main()
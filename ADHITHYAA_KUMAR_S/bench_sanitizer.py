@@ -0,0 +1,79 @@
+# bench_sanitizer.py - throughput of the old five-pass sanitizer vs the new one
+#
+# Usage:
+#   python bench_sanitizer.py [--size-kb 1024] [--chunk 32]
+import argparse
+import random
+import re
+import time
+
+from sanitizer import ResponseSanitizer
+
+
+def legacy_sanitize(text):
+    """The per-call pattern list and five re.sub passes it replaces"""
+    forbidden_patterns = [
+        r'(?i)nexa\s+bank',
+        r'(?i)abc\s+bank',
+        r'(?i)xyz\s+bank',
+        r'(?i)our\s+bank',
+        r'(?i)we\s+offer',
+    ]
+    for pattern in forbidden_patterns:
+        text = re.sub(pattern, 'banks', text)
+    return text
+
+
+def make_text(size_kb, seed=7):
+    random.seed(seed)
+    words = ("banks typically offer savings accounts fixed deposits loans "
+             "interest rates vary by institution and our bank we offer "
+             "NEXA Bank xyz  bank customers should compare").split()
+    out, size = [], 0
+    while size < size_kb * 1024:
+        word = random.choice(words)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)
+
+
+def throughput(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    elapsed = time.perf_counter() - start
+    return len(text) * repeat / elapsed / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-kb", type=int, default=1024)
+    parser.add_argument("--chunk", type=int, default=32,
+                        help="chunk size for the streaming run")
+    args = parser.parse_args()
+
+    sanitizer = ResponseSanitizer()
+    text = make_text(args.size_kb)
+    small = make_text(4)  # about one 800-token answer
+
+    def streamed(t):
+        stream = sanitizer.stream()
+        parts = [stream.feed(t[i:i + args.chunk])
+                 for i in range(0, len(t), args.chunk)]
+        parts.append(stream.flush())
+        return "".join(parts)
+
+    assert streamed(text) == sanitizer.sanitize(text)
+
+    print("=" * 60)
+    print(f"{'':28}{'4 KB MB/s':>14}{f'{args.size_kb} KB MB/s':>16}")
+    for name, fn in [("legacy (5 x re.sub)", legacy_sanitize),
+                     ("single pass", sanitizer.sanitize),
+                     (f"streamed, {args.chunk} B chunks", streamed)]:
+        print(f"{name:28}{throughput(fn, small, 2000):14.1f}"
+              f"{throughput(fn, text, 5):16.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# canonicalize.py - BANKBOT AI - cache key canonicalization
+import hashlib
+import re
+import unicodedata
+
+# Longer phrases first so "equated monthly installments" wins over a
+# partial rewrite. Every variant maps to one canonical token.
+BANKING_SYNONYMS = {
+    "equated monthly installments": "emi",
+    "equated monthly installment": "emi",
+    "equated monthly instalments": "emi",
+    "equated monthly instalment": "emi",
+    "monthly installment": "emi",
+    "fixed deposits": "fd",
+    "fixed deposit": "fd",
+    "term deposit": "fd",
+    "recurring deposits": "rd",
+    "recurring deposit": "rd",
+    "automated teller machine": "atm",
+    "know your customer": "kyc",
+    "net banking": "netbanking",
+    "internet banking": "netbanking",
+    "online banking": "netbanking",
+    "credit cards": "credit card",
+    "debit cards": "debit card",
+    "cheque book": "chequebook",
+    "check book": "chequebook",
+    "savings account": "savings",
+    "saving account": "savings",
+    "interest rates": "interest rate",
+    "whats": "what is",
+    "hows": "how is",
+    "pls": "please",
+    "plz": "please",
+}
+
+# Articles never change what a banking FAQ is asking
+FILLER_WORDS = {"a", "an", "the"}
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+_SYNONYM_RE = re.compile(
+    r"\b(" + "|".join(
+        re.escape(k) for k in sorted(BANKING_SYNONYMS, key=len, reverse=True)
+    ) + r")\b"
+)
+
+
+def canonicalize_prompt(prompt):
+    """Reduce a prompt to the form used for cache keys"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    # Apostrophes are dropped rather than split so "what's" stays one word
+    text = text.replace("'", "").replace("’", "")
+    text = _PUNCT_RE.sub(" ", text)
+    text = _SPACE_RE.sub(" ", text).strip()
+    text = _SYNONYM_RE.sub(lambda m: BANKING_SYNONYMS[m.group(1)], text)
+    return " ".join(w for w in text.split(" ") if w not in FILLER_WORDS)
+
+
+def cache_key(prompt):
+    # Punctuation-only prompts canonicalize to "" - keep them apart
+    key = canonicalize_prompt(prompt) or prompt
+    return hashlib.md5(key.encode()).hexdigest()
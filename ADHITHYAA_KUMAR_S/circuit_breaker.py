@@ -0,0 +1,86 @@
+# circuit_breaker.py - BANKBOT AI - stop calling Gemini while it is failing
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Classic three-state breaker
+
+    closed    - calls go through; consecutive failures are counted
+    open      - calls are refused until recovery_timeout has passed
+    half_open - one probe call is let through; success closes the
+                breaker, failure opens it again
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def allow(self):
+        """True if the caller may try the upstream now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self.short_circuited += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+
+            # Half open: exactly one caller gets to probe
+            if self._probe_in_flight:
+                self.short_circuited += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self.state = CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """Caller gave up without an outcome (e.g. client went away)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.recovery_timeout
+                               - (time.monotonic() - self._opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "times_opened": self.times_opened,
+                "short_circuited": self.short_circuited,
+                "retry_in_s": round(retry_in, 1),
+            }
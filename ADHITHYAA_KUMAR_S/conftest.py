@@ -0,0 +1,5 @@
+# conftest.py - pytest settings for this folder
+#
+# test_api.py is a manual check against the live Gemini API (it needs a
+# real GEMINI_API_KEY and exits without one), not a unit test.
+collect_ignore = ["test_api.py"]
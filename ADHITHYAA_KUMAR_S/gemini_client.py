@@ -0,0 +1,176 @@
+# gemini_client.py - BANKBOT AI - pooled upstream client for Gemini
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class GeminiClient:
+    """Keep-alive HTTP client with retries and optional hedged requests"""
+
+    def __init__(self, pool_size=32, connect_timeout=3.05, read_timeout=15,
+                 max_retries=2, backoff_base=0.25, backoff_max=4.0,
+                 hedge=False, hedge_min_delay=0.5, latency_window=200):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+
+        # One pool shared by every Flask thread; keep-alive skips the
+        # TCP+TLS handshake on all but the first call per connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size,
+                              pool_block=False, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Hedged duplicates need their own threads to race the original
+        self._executor = (ThreadPoolExecutor(max_workers=pool_size,
+                                             thread_name_prefix="gemini-hedge")
+                          if hedge else None)
+
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.network_errors = 0
+        self.status_counts = {}  # per attempt, so retried 429s show up
+
+    # ---------- latency tracking ----------
+
+    def _record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def p95(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def hedge_delay(self):
+        p95 = self.p95()
+        if p95 is None:
+            return self.read_timeout / 2
+        return max(self.hedge_min_delay, p95)
+
+    # ---------- sending ----------
+
+    def _send(self, url, payload, stream=False):
+        with self._lock:
+            self.requests_sent += 1
+        start = time.time()
+        try:
+            response = self.session.post(
+                url, json=payload, stream=stream,
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
+        except requests.RequestException:
+            with self._lock:
+                self.network_errors += 1
+            raise
+        with self._lock:
+            status = response.status_code
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        # A streamed response is only at its headers here, so its
+        # timing would drag the p95 used for hedging down
+        if response.status_code == 200 and not stream:
+            self._record_latency(time.time() - start)
+        return response
+
+    def _send_hedged(self, url, payload):
+        primary = self._executor.submit(self._send, url, payload)
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges_sent += 1
+        backup = self._executor.submit(self._send, url, payload)
+        pending = {primary, backup}
+
+        # First successful answer wins; a failure only counts once both fail
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    result = result or e
+                    continue
+                if response.status_code == 200:
+                    if future is backup:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return response
+                result = response
+
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _backoff(self, attempt, response=None):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # Full jitter spreads retries from many threads apart
+        delay = random.uniform(0, delay)
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, min(self.backoff_max, int(retry_after)))
+        time.sleep(delay)
+
+    def post(self, url, payload, stream=False):
+        """POST with retries on 429/5xx and network errors
+
+        With stream=True the body is left unread; retries only cover
+        failures before the first byte and hedging is skipped.
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self.retries += 1
+            try:
+                if self.hedge and not stream:
+                    response = self._send_hedged(url, payload)
+                else:
+                    response = self._send(url, payload, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                if attempt < self.max_retries:
+                    self._backoff(attempt)
+                continue
+
+            if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                return response
+            response.close()
+            self._backoff(attempt, response)
+
+        raise last_error
+
+    def stats(self):
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "requests_sent": self.requests_sent,
+                "retries": self.retries,
+                "hedging": self.hedge,
+                "hedges_sent": self.hedges_sent,
+                "hedge_wins": self.hedge_wins,
+                "network_errors": self.network_errors,
+                "status_counts": {str(k): v for k, v in self.status_counts.items()},
+                "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            }
@@ -0,0 +1,198 @@
+# gemini_stub.py - local stand-in for the Gemini generateContent API
+#
+# Usage:
+#   python gemini_stub.py --port 8089 --latency 0.5
+#   python gemini_stub.py --error-rate 0.05 --rate-429 0.02 --output-chars 2000
+#   GEMINI_BASE_URL=http://localhost:8089/v1beta/models python ai_backend.py
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+STUB_TEXT = "**Stub answer**\n\n- Banks typically offer this service."
+
+
+class StubConfig:
+    latency = 0.5       # seconds per generateContent call
+    jitter = 0.0        # +/- seconds added uniformly to each call
+    chunks = 5          # streamGenerateContent chunks, spread over the latency
+    error_rate = 0.0    # fraction of calls answered with a 500/503
+    rate_429 = 0.0      # fraction of calls answered with a 429
+    output_chars = 0    # answer length; 0 keeps the short STUB_TEXT
+
+
+def stub_text():
+    if StubConfig.output_chars <= len(STUB_TEXT):
+        return STUB_TEXT
+    filler = "\n- Financial institutions usually publish the details online."
+    repeats = (StubConfig.output_chars - len(STUB_TEXT)) // len(filler) + 1
+    return (STUB_TEXT + filler * repeats)[:StubConfig.output_chars]
+
+
+def pick_fault():
+    """Status code to fail this call with, or None to answer it"""
+    roll = random.random()
+    if roll < StubConfig.rate_429:
+        return 429
+    if roll < StubConfig.rate_429 + StubConfig.error_rate:
+        return random.choice((500, 503))
+    return None
+
+
+def call_latency():
+    return max(0.0, StubConfig.latency
+               + random.uniform(-StubConfig.jitter, StubConfig.jitter))
+
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token for English text
+    return max(1, len(text) // 4)
+
+
+def prompt_tokens(request):
+    """Estimated promptTokenCount for a generateContent request body"""
+    texts = [p.get("text", "")
+             for c in request.get("contents", []) for p in c.get("parts", [])]
+    texts += [p.get("text", "")
+              for p in (request.get("systemInstruction") or {}).get("parts", [])]
+    return estimate_tokens("".join(texts))
+
+
+def make_response(text, prompt_count=0, candidate_count=None):
+    if candidate_count is None:
+        candidate_count = estimate_tokens(text)
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP"
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_count,
+            "candidatesTokenCount": candidate_count,
+            "totalTokenCount": prompt_count + candidate_count
+        }
+    }
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out as two writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_fault(self, status):
+        if status == 429:
+            self._send_json(429, {"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED",
+                "message": "Resource has been exhausted (stub)"
+            }}, headers={"Retry-After": "1"})
+        else:
+            self._send_json(status, {"error": {
+                "code": status, "status": "UNAVAILABLE",
+                "message": "The service is currently unavailable (stub)"
+            }})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+        prompt_count = prompt_tokens(body)
+
+        if (":streamGenerateContent" not in self.path
+                and ":generateContent" not in self.path):
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+
+        fault = pick_fault()
+        if fault:
+            # Real errors come back quicker than answers
+            time.sleep(call_latency() / 10)
+            self._send_fault(fault)
+            return
+
+        if ":streamGenerateContent" in self.path:
+            self._stream(stub_text(), prompt_count)
+            return
+
+        time.sleep(call_latency())
+        self._send_json(200, make_response(stub_text(), prompt_count))
+
+    def _stream(self, text, prompt_count=0):
+        # alt=sse framing: one "data: {...}" event per chunk
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        step = max(1, len(text) // StubConfig.chunks)
+        delay = call_latency() / StubConfig.chunks
+        for i in range(0, len(text), step):
+            time.sleep(delay)
+            # usageMetadata is cumulative, as in the real stream
+            event = json.dumps(make_response(
+                text[i:i + step], prompt_count, estimate_tokens(text[:i + step])
+            ))
+            self._write_chunk(f"data: {event}\r\n\r\n".encode())
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    # The socketserver default backlog of 5 drops connection bursts
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def configure(latency=0.5, jitter=0.0, error_rate=0.0, rate_429=0.0,
+              output_chars=0):
+    StubConfig.latency = latency
+    StubConfig.jitter = jitter
+    StubConfig.error_rate = error_rate
+    StubConfig.rate_429 = rate_429
+    StubConfig.output_chars = output_chars
+
+
+def serve(port=8089, latency=0.5, **options):
+    """Start the stub in the background and return the server"""
+    configure(latency, **options)
+    server = StubServer(("127.0.0.1", port), GeminiStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini API stub")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of calls failing with 500/503")
+    parser.add_argument("--rate-429", type=float, default=0.0,
+                        help="fraction of calls failing with 429")
+    parser.add_argument("--output-chars", type=int, default=0)
+    args = parser.parse_args()
+
+    configure(args.latency, args.jitter, args.error_rate, args.rate_429,
+              args.output_chars)
+    print(f"🧪 Gemini stub on http://127.0.0.1:{args.port}/v1beta/models "
+          f"(latency {args.latency}s, errors {args.error_rate:.0%}, "
+          f"429s {args.rate_429:.0%})")
+    StubServer(("127.0.0.1", args.port), GeminiStubHandler).serve_forever()
@@ -0,0 +1,109 @@
+# local_faq.py - BANKBOT AI - canned answers for degraded mode
+import re
+
+from canonicalize import canonicalize_prompt
+
+FOOTER = "\n\n---\n*🤖 BankBot AI (offline answer)*"
+
+# (topic, extra, answer). Every topic keyword must appear for an entry to
+# count ("a|b" means either word); extra words such as "open" or "lost"
+# only break ties between entries whose topics all match. Keywords are
+# written in canonical form (see canonicalize.BANKING_SYNONYMS).
+LOCAL_FAQ = [
+    (["emi"], ["loan", "calculate"],
+     "**EMI (Equated Monthly Instalment)**\n\n"
+     "- A fixed monthly payment that repays a loan over its tenure\n"
+     "- Each EMI covers part of the principal and the interest due\n"
+     "- It depends on the loan amount, interest rate and tenure"),
+    (["savings"], ["open", "account"],
+     "**Opening a Savings Account**\n\n"
+     "- Pick a bank and account type\n"
+     "- Submit the application with identity and address proof (KYC)\n"
+     "- Make the initial deposit, if one is required"),
+    (["fd"], ["open", "interest", "rate"],
+     "**Fixed Deposit (FD)**\n\n"
+     "- A lump sum deposited for a fixed term at a fixed interest rate\n"
+     "- Rates usually rise with the tenure; senior citizens often get more\n"
+     "- Breaking an FD early typically carries a penalty"),
+    (["rd"], ["open", "interest", "rate"],
+     "**Recurring Deposit (RD)**\n\n"
+     "- A fixed amount is deposited every month for a chosen term\n"
+     "- Interest is similar to a fixed deposit of the same tenure\n"
+     "- Useful for building savings in small instalments"),
+    (["kyc"], ["documents", "document"],
+     "**KYC (Know Your Customer)**\n\n"
+     "- Banks verify identity and address before opening accounts\n"
+     "- Common documents: government photo ID and address proof\n"
+     "- KYC may need to be refreshed periodically"),
+    (["netbanking"], ["password", "reset", "forgot", "login"],
+     "**Resetting a Net Banking Password**\n\n"
+     "- Use the \"Forgot password\" option on the login page\n"
+     "- Verify with registered mobile OTP, card details or account details\n"
+     "- Set a new strong password and never share it"),
+    (["card|debit card|credit card", "block|lost|stolen"], [],
+     "**Blocking a Lost Card**\n\n"
+     "- Block it immediately through the mobile app, net banking or helpline\n"
+     "- Report any unauthorised transactions right away\n"
+     "- Request a replacement card once it is blocked"),
+    (["credit card"], ["apply", "new", "get"],
+     "**Applying for a Credit Card**\n\n"
+     "- Compare fees, interest rates and rewards\n"
+     "- Apply online or at a branch with KYC and income proof\n"
+     "- Approval depends on income and credit score"),
+    (["chequebook"], ["request", "new", "get"],
+     "**Requesting a Cheque Book**\n\n"
+     "- Request it through net banking, the mobile app, an ATM or a branch\n"
+     "- It is usually delivered to the registered address within days"),
+    (["neft|rtgs|imps|transfer"], ["money", "send", "difference"],
+     "**Money Transfer Options**\n\n"
+     "- NEFT: batch-based transfers, any amount\n"
+     "- RTGS: real-time, meant for large amounts\n"
+     "- IMPS/UPI: instant transfers, available 24x7"),
+    (["ifsc"], ["code"],
+     "**IFSC Code**\n\n"
+     "- An 11-character code that identifies a bank branch\n"
+     "- Needed for NEFT, RTGS and IMPS transfers\n"
+     "- Printed on cheques and passbooks"),
+    (["home", "loan|loans"], ["apply", "eligibility", "documents"],
+     "**Home Loans**\n\n"
+     "- Eligibility depends on income, credit score and property value\n"
+     "- Compare interest rate type (fixed or floating) and fees\n"
+     "- Documents usually include KYC, income proof and property papers"),
+    (["interest rate"], [],
+     "**Interest Rates**\n\n"
+     "- Rates vary by product, tenure and institution\n"
+     "- Check the bank's official website or branch for current rates"),
+]
+
+DEGRADED_MESSAGE = (
+    "BankBot AI is running in offline mode right now and can only answer "
+    "common banking questions. Please try again in a minute."
+)
+
+
+def _pattern(keyword):
+    return re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keyword.split("|")) + r")\b")
+
+
+_COMPILED = [
+    ([_pattern(k) for k in topic], [_pattern(k) for k in extra], answer)
+    for topic, extra, answer in LOCAL_FAQ
+]
+
+
+def local_answer(prompt):
+    """Best matching canned answer, or None if nothing fits or two entries
+    fit equally well"""
+    text = canonicalize_prompt(prompt)
+    scores = []
+    for topic, extra, answer in _COMPILED:
+        if all(p.search(text) for p in topic):
+            # More topic keywords = a more specific entry; extras break ties
+            score = (len(topic), sum(1 for p in extra if p.search(text)))
+            scores.append((score, answer))
+    if not scores:
+        return None
+    scores.sort(key=lambda s: s[0], reverse=True)
+    if len(scores) > 1 and scores[0][0] == scores[1][0]:
+        return None
+    return scores[0][1] + FOOTER
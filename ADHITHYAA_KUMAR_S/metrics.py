@@ -0,0 +1,97 @@
+# metrics.py - BANKBOT AI - counters and latency histograms for /metrics
+import bisect
+import threading
+import time
+
+# Geometric bucket bounds in ms: 0.1 ms .. ~2 min, each 20% wider than
+# the last, so any percentile is within 20% of the true value
+BUCKET_BOUNDS_MS = []
+_bound = 0.1
+while _bound < 120000:
+    BUCKET_BOUNDS_MS.append(round(_bound, 3))
+    _bound *= 1.2
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two increments"""
+
+    def __init__(self):
+        self._counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        # Bucket lookup happens outside the lock; only the adds are guarded
+        index = bisect.bisect_left(BUCKET_BOUNDS_MS, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += ms
+            if ms > self._max:
+                self._max = ms
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            count, total, peak = self._count, self._sum, self._max
+
+        def percentile(q):
+            if not count:
+                return 0.0
+            rank = q * count
+            seen = 0
+            for index, bucket in enumerate(counts):
+                seen += bucket
+                if seen >= rank:
+                    if index == len(BUCKET_BOUNDS_MS):
+                        return round(peak, 2)
+                    return round(min(BUCKET_BOUNDS_MS[index], peak), 2)
+            return round(peak, 2)
+
+        return {
+            "count": count,
+            "mean": round(total / count, 2) if count else 0.0,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": round(peak, 2),
+        }
+
+
+class Metrics:
+    """Named counters and histograms for one backend process"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def observe(self, name, ms):
+        self.histogram(name).observe(ms)
+
+    def count(self, name):
+        return self._counters.get(name, 0)
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "counters": counters,
+            "latency_ms": {name: h.snapshot() for name, h in histograms.items()},
+        }
@@ -0,0 +1,271 @@
+# response_cache.py - BANKBOT AI - bounded response cache
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SQLiteStore:
+    """Disk-backed cache shared by every worker process and restart"""
+
+    def __init__(self, path, ttl=60):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " timestamp REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_ts"
+            " ON response_cache (timestamp)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            # WAL lets readers in other workers proceed while one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return (data, timestamp) for a live entry, else None"""
+        try:
+            row = self._conn().execute(
+                "SELECT data, timestamp FROM response_cache"
+                " WHERE key = ? AND timestamp > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, data, timestamp):
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, data, timestamp)"
+                " VALUES (?, ?, ?)",
+                (key, json.dumps(data, ensure_ascii=False), timestamp),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            # The disk tier is best effort; the memory tier still has it
+            pass
+
+    def purge_expired(self):
+        try:
+            conn = self._conn()
+            conn.execute(
+                "DELETE FROM response_cache WHERE timestamp <= ?",
+                (time.time() - self.ttl,),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM response_cache")
+        conn.commit()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with TTL expiry and an entry/byte budget
+
+    With a ``store`` the in-memory LRU becomes a front tier: misses fall
+    through to the shared store and writes go to both.
+
+    With ``stale_ttl`` entries older than ``ttl`` are kept for that much
+    longer; ``lookup`` still returns them, flagged stale, so the caller can
+    answer at once and refresh in the background. Past ``ttl + stale_ttl``
+    (the hard max age) they are gone.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024, max_bytes=8 * 1024 * 1024,
+                 store=None, stale_ttl=0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_age = ttl + stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+
+        # key -> {"data", "timestamp", "size"}, ordered oldest-used first
+        self._entries = OrderedDict()
+        # (timestamp, key) in insertion order; TTL is fixed so this is
+        # (almost) expiry order and lets us drop expired entries from the front
+        self._expiry = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.store_hits = 0
+        self.stale_hits = 0
+
+    @staticmethod
+    def _sizeof(data):
+        return len(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+    def _purge_expired(self, now):
+        cutoff = now - self.max_age
+        while self._expiry and self._expiry[0][0] <= cutoff:
+            timestamp, key = self._expiry.popleft()
+            entry = self._entries.get(key)
+            # Skip stale queue records for keys that were re-set later
+            if entry is not None and entry["timestamp"] == timestamp:
+                self._drop(key)
+                self.expirations += 1
+
+    def get(self, key):
+        """Return fresh cached data for key, or None on miss/expiry"""
+        hit = self._lookup(key, allow_stale=False)
+        return hit[0] if hit is not None else None
+
+    def lookup(self, key):
+        """Return (data, stale) for key, or None past the hard max age"""
+        return self._lookup(key, allow_stale=True)
+
+    def _lookup(self, key, allow_stale):
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            # Entries loaded from the store can sit behind newer ones in
+            # the expiry queue, so check the timestamp itself as well
+            if entry is not None and entry["timestamp"] <= now - self.max_age:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                stale = entry["timestamp"] <= now - self.ttl
+                if not stale or allow_stale:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.stale_hits += stale
+                    return entry["data"], stale
+                # Stale but the caller wants fresh only; the store holds
+                # the same copy, so don't bother asking it
+                self.misses += 1
+                return None
+
+        if self.store is not None:
+            stored = self.store.get(key)
+            if stored is not None:
+                data, timestamp = stored
+                stale = timestamp <= now - self.ttl
+                self._insert(key, data, timestamp)
+                if not stale or allow_stale:
+                    with self._lock:
+                        self.hits += 1
+                        self.store_hits += 1
+                        self.stale_hits += stale
+                    return data, stale
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, data):
+        now = time.time()
+        self._insert(key, data, now)
+        if self.store is not None:
+            self.store.set(key, data, now)
+
+    def _insert(self, key, data, now):
+        size = self._sizeof(data)
+        with self._lock:
+            self._purge_expired(now)
+            if key in self._entries:
+                self._drop(key)
+
+            # A single oversized response is not worth evicting everything for
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = {"data": data, "timestamp": now, "size": size}
+            self._expiry.append((now, key))
+            self._bytes += size
+
+            while (len(self._entries) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+            # Keep the expiry queue from growing without bound when the
+            # same keys are rewritten over and over
+            if len(self._expiry) > 2 * self.max_entries:
+                self._expiry = deque(
+                    (e["timestamp"], k) for k, e in
+                    sorted(self._entries.items(), key=lambda kv: kv[1]["timestamp"])
+                )
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_expired(time.time())
+        if self.store is not None:
+            self.store.purge_expired()
+
+    def start_sweeper(self, interval=None):
+        """Expire entries in the background so idle keys don't pin memory"""
+        interval = interval or max(1, self.ttl / 2)
+
+        def sweep():
+            while True:
+                time.sleep(interval)
+                self.purge_expired()
+
+        thread = threading.Thread(target=sweep, name="cache-sweeper", daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self._bytes = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "store": self.store.path if self.store is not None else None,
+                "store_hits": self.store_hits,
+                "stale_hits": self.stale_hits,
+            }
@@ -0,0 +1,107 @@
+# sanitizer.py - BANKBOT AI - brand/marketing phrase scrubber
+import re
+
+FORBIDDEN_PHRASES = [
+    "nexa bank",
+    "abc bank",
+    "xyz bank",
+    "our bank",
+    "we offer",
+]
+
+
+class ResponseSanitizer:
+    """Replace forbidden phrases in one pass over the text
+
+    All phrases are compiled once into a single alternation; words inside
+    a phrase match across any run of whitespace, so "Our \n Bank" is
+    caught too. Matching runs on a lowercased copy with a case-sensitive
+    pattern, which lets the regex engine skip ahead on the phrases' first
+    letters instead of trying every alternative at every position.
+    """
+
+    def __init__(self, phrases=FORBIDDEN_PHRASES, replacement="banks"):
+        self.replacement = replacement
+        self.phrases = [" ".join(p.lower().split()) for p in phrases if p.strip()]
+        self.max_len = max((len(p) for p in self.phrases), default=0)
+        self._first_chars = {p[0] for p in self.phrases}
+
+        # Longest first so a phrase never loses to one of its own prefixes
+        ordered = sorted(self.phrases, key=len, reverse=True)
+        source = "|".join(r"\s+".join(map(re.escape, p.split())) for p in ordered)
+        self._pattern = re.compile(source) if ordered else None
+        # For the rare text whose lowercase form changes length
+        self._pattern_i = re.compile(source, re.IGNORECASE) if ordered else None
+
+    def _matches(self, text):
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            return self._pattern_i.finditer(text)
+        return self._pattern.finditer(lowered)
+
+    def sanitize(self, text):
+        if not text or self._pattern is None:
+            return text
+
+        parts = []
+        last = 0
+        for match in self._matches(text):
+            parts.append(text[last:match.start()])
+            parts.append(self.replacement)
+            last = match.end()
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def stream(self):
+        return StreamSanitizer(self)
+
+    def safe_cut(self, text):
+        """Index before which text can be sanitized without seeing more"""
+        cut = len(text)
+        if self._pattern is None:
+            return cut
+
+        # Walk back over the tail while it is still short enough to be
+        # the beginning of a phrase that the next chunk might complete
+        trailing = " " if text[-1:].isspace() else ""
+        for start in range(len(text) - 1, -1, -1):
+            if text[start].isspace():
+                continue
+            collapsed = " ".join(text[start:].lower().split())
+            if len(collapsed) > self.max_len:
+                break
+            if collapsed[0] not in self._first_chars:
+                continue
+            if any(p.startswith(collapsed + trailing) for p in self.phrases):
+                cut = start
+
+        # Never split a match that is already complete
+        for match in self._matches(text):
+            if match.start() < cut < match.end():
+                cut = match.end()
+        return cut
+
+
+class StreamSanitizer:
+    """Incremental sanitizer for streamed chunks
+
+    Text that could be the start of a forbidden phrase is held back until
+    the next chunk decides it, so a phrase split across chunks is still
+    replaced. Output is identical to sanitizing the joined text.
+    """
+
+    def __init__(self, sanitizer):
+        self._sanitizer = sanitizer
+        self._pending = ""
+
+    def feed(self, chunk):
+        self._pending += chunk
+        cut = self._sanitizer.safe_cut(self._pending)
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._sanitizer.sanitize(ready)
+
+    def flush(self):
+        ready, self._pending = self._pending, ""
+        return self._sanitizer.sanitize(ready)
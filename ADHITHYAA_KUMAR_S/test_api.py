@@ -144,4 +144,27 @@ models_to_check = [
 
 for model in models_to_check:
     available, message = check_model(model)
-    print(f"{model:30} {message}")
\ No newline at end of file
+    print(f"{model:30} {message}")
+# ai_backend.py sends the static rules as systemInstruction; check that the
+# endpoint it calls accepts that field (a 400 here means every chat fails)
+print("\n" + "=" * 70)
+print("🔍 CHECKING systemInstruction")
+print("=" * 70)
+
+base_url = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/models")
+system_payload = dict(payload, systemInstruction={
+    "parts": [{"text": "Answer in one word."}]
+})
+try:
+    response = requests.post(
+        f"{base_url}/gemini-2.5-flash:generateContent?key={api_key}",
+        json=system_payload,
+        headers=headers,
+        timeout=15
+    )
+    if response.status_code == 200:
+        print(f"✅ {base_url} accepts systemInstruction")
+    else:
+        print(f"❌ {base_url} returned {response.status_code}: {response.text[:200]}")
+except requests.exceptions.RequestException as e:
+    print(f"❌ Request failed: {e}")
@@ -0,0 +1,96 @@
+# test_circuit_breaker.py - closed / open / half-open transitions
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+
+def tripped(clock, threshold=3, recovery=30.0):
+    breaker = CircuitBreaker(failure_threshold=threshold, recovery_timeout=recovery)
+    for _ in range(threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_success_resets_the_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_open_refuses_until_recovery_timeout(clock):
+    breaker = tripped(clock)
+    clock.now += 29
+    assert not breaker.allow()
+    assert breaker.stats()["short_circuited"] == 1
+    assert breaker.stats()["retry_in_s"] == 1.0
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # second caller while the probe runs
+
+
+def test_probe_success_closes(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_failure_reopens(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["times_opened"] == 2
+
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_released_probe_frees_the_slot(clock):
+    # A probe whose client went away says nothing about Gemini
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,132 @@
+# test_rate_limit.py - only requests that call Gemini spend rate limit tokens
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ai_backend
+import ai_backend_async
+from admission import AdmissionController, AdmissionRejected
+from singleflight import SingleFlight
+
+BURST = 2
+BATCH_BURST = 60
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController(rate_per_min=1, burst=BURST,
+                                     batch_rate_per_min=1, batch_burst=BATCH_BURST)
+    monkeypatch.setattr(ai_backend, "admission", controller)
+    monkeypatch.setattr(ai_backend_async, "admission", controller)
+    return controller
+
+
+def test_before_runs_for_the_leader_only():
+    flight = SingleFlight()
+    release = threading.Event()
+    charged = []
+
+    def call():
+        release.wait(2)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flight.do, "k", call, lambda: charged.append(1))
+        while not flight.in_flight():
+            time.sleep(0.001)
+        followers = [pool.submit(flight.do, "k", call, lambda: charged.append(1))
+                     for _ in range(4)]
+        while flight.stats()["upstream_calls_saved"] < 4:
+            time.sleep(0.001)
+        release.set()
+        assert leader.result() == ("answer", False)
+        assert [f.result() for f in followers] == [("answer", True)] * 4
+    assert charged == [1]
+
+
+def test_failed_before_starts_nothing():
+    flight = SingleFlight()
+
+    def refuse():
+        raise AdmissionRejected("rate_limited", 1)
+
+    with pytest.raises(AdmissionRejected):
+        flight.do("k", lambda: "answer", refuse)
+    assert flight.in_flight() == 0
+    assert flight.do("k", lambda: "answer") == ("answer", False)
+
+
+def test_identical_concurrent_prompts_cost_one_token(admission, monkeypatch):
+    calls = []
+
+    def slow_gemini(query, client="unknown"):
+        calls.append(query)
+        time.sleep(0.3)
+        return True, "An EMI is a fixed monthly payment."
+
+    monkeypatch.setattr(ai_backend.bankbot, "call_gemini_api", slow_gemini)
+    prompt = f"What is EMI? {uuid.uuid4().hex}"
+    client = ai_backend.app.test_client()
+
+    def ask(_):
+        return client.post("/api/chat", json={"prompt": prompt}).status_code
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        statuses = list(pool.map(ask, range(20)))
+
+    assert statuses == [200] * 20
+    assert len(calls) == 1
+    assert admission.stats()["rate_limited"] == 0
+
+
+def test_async_identical_concurrent_prompts_cost_one_token(admission, monkeypatch):
+    calls = []
+
+    async def slow_gemini(query, client="unknown"):
+        calls.append(query)
+        await asyncio.sleep(0.3)
+        return True, "An EMI is a fixed monthly payment."
+
+    monkeypatch.setattr(ai_backend_async, "call_gemini_api", slow_gemini)
+    prompt = f"What is EMI? {uuid.uuid4().hex}"
+
+    async def main():
+        client = ai_backend_async.app.test_client()
+        responses = await asyncio.gather(*[
+            client.post("/api/chat", json={"prompt": prompt}) for _ in range(20)
+        ])
+        return [r.status_code for r in responses]
+
+    assert asyncio.run(main()) == [200] * 20
+    assert len(calls) == 1
+    assert admission.stats()["rate_limited"] == 0
+
+
+def test_distinct_prompts_still_limited(admission, monkeypatch):
+    monkeypatch.setattr(ai_backend.bankbot, "call_gemini_api",
+                        lambda query, client="unknown": (True, "answer"))
+    client = ai_backend.app.test_client()
+    statuses = [client.post("/api/chat", json={"prompt": f"loan {uuid.uuid4().hex}"}).status_code
+                for _ in range(BURST + 1)]
+    assert statuses == [200] * BURST + [429]
+
+
+def test_batches_spend_their_own_budget(admission, monkeypatch):
+    monkeypatch.setattr(ai_backend.bankbot, "call_gemini_api",
+                        lambda query, client="unknown": (True, "answer"))
+    client = ai_backend.app.test_client()
+    prompts = [f"loan {uuid.uuid4().hex}" for _ in range(BATCH_BURST + 5)]
+
+    body = client.post("/api/chat/batch", json={"prompts": prompts}).get_json()
+    assert body["upstream_calls"] == BATCH_BURST
+    assert body["rate_limited"] == 5
+    assert [r.get("error") for r in body["results"][-5:]] == ["rate_limited"] * 5
+
+    # The batch left the client's chat tokens alone
+    statuses = [client.post("/api/chat", json={"prompt": f"emi {uuid.uuid4().hex}"}).status_code
+                for _ in range(BURST)]
+    assert statuses == [200] * BURST
@@ -0,0 +1,100 @@
+# test_response_cache.py - LRU, TTL and stale-while-revalidate behaviour
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, SQLiteStore
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+def test_hit_and_miss(clock):
+    cache = ResponseCache(ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", {"response": "A"})
+    assert cache.get("a") == {"response": "A"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_evicts_least_recently_used(clock):
+    cache = ResponseCache(ttl=60, max_entries=2)
+    cache.set("a", {"response": "A"})
+    cache.set("b", {"response": "B"})
+    cache.get("a")  # b is now the least recently used
+    cache.set("c", {"response": "C"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget(clock):
+    size = ResponseCache._sizeof({"response": "x" * 100})
+    cache = ResponseCache(ttl=60, max_bytes=2 * size)
+    for key in "abc":
+        cache.set(key, {"response": "x" * 100})
+    assert len(cache) == 2 and cache.get("a") is None
+    assert cache.stats()["bytes"] <= 2 * size
+
+    # One entry bigger than the whole budget is not cached at all
+    cache.set("huge", {"response": "x" * 1000})
+    assert cache.get("huge") is None
+    assert len(cache) == 2
+
+
+def test_expires_after_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.set("a", {"response": "A"})
+    clock.now += 59
+    assert cache.get("a") is not None
+    clock.now += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.stats()["expirations"] == 1
+
+
+def test_reset_entry_gets_a_new_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.set("a", {"response": "old"})
+    clock.now += 50
+    cache.set("a", {"response": "new"})
+    clock.now += 20  # the first write's queue record expires here
+    assert cache.get("a") == {"response": "new"}
+
+
+def test_stale_entries_served_until_max_age(clock):
+    cache = ResponseCache(ttl=60, stale_ttl=30)
+    cache.set("a", {"response": "A"})
+    assert cache.lookup("a") == ({"response": "A"}, False)
+
+    clock.now += 70
+    assert cache.lookup("a") == ({"response": "A"}, True)
+    # get() only returns fresh entries
+    assert cache.get("a") is None
+
+    clock.now += 25  # 95 s old, past ttl + stale_ttl
+    assert cache.lookup("a") is None
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_store_fills_memory_tier(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = ResponseCache(ttl=60, store=SQLiteStore(path, ttl=60))
+    writer.set("a", {"response": "A"})
+
+    # A second worker with an empty memory tier reads it from disk
+    reader = ResponseCache(ttl=60, store=SQLiteStore(path, ttl=60))
+    assert reader.get("a") == {"response": "A"}
+    assert reader.stats()["store_hits"] == 1
+    assert len(reader) == 1
@@ -0,0 +1,95 @@
+# test_sanitizer.py - one-pass sanitizer and its streaming form
+import random
+import re
+
+import pytest
+
+from sanitizer import FORBIDDEN_PHRASES, ResponseSanitizer
+
+
+def reference_sanitize(text):
+    """Slow oracle: at each position replace the longest phrase starting
+    there, else keep the character; replacements are not re-scanned"""
+    patterns = [re.compile(r"\s+".join(map(re.escape, p.split())), re.IGNORECASE)
+                for p in sorted(FORBIDDEN_PHRASES, key=len, reverse=True)]
+    out, i = [], 0
+    while i < len(text):
+        for pattern in patterns:
+            match = pattern.match(text, i)
+            if match:
+                out.append("banks")
+                i = match.end()
+                break
+        else:
+            out.append(text[i])
+            i += 1
+    return "".join(out)
+
+
+def random_text(rng, words=60):
+    vocab = ["banks", "typically", "offer", "our", "bank", "we", "nexa", "NEXA",
+             "Bank", "xyz", "abc", "Our", "We", "Offer", "savings", "ourbank",
+             "offers", "account", "\n", "  ", "\t"]
+    out = []
+    for _ in range(words):
+        out.append(rng.choice(vocab))
+        out.append(rng.choice([" ", " ", " ", "  ", "\n", ""]))
+    return "".join(out)
+
+
+def split_at(text, cuts):
+    cuts = sorted(set(cuts))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Our bank offers loans", "banks offers loans"),
+    ("NEXA   Bank and xyz\nbank", "banks and banks"),
+    ("We Offer FDs", "banks FDs"),
+    ("ourbank is not a phrase", "ourbank is not a phrase"),
+    ("", ""),
+])
+def test_sanitize(text, expected):
+    assert ResponseSanitizer().sanitize(text) == expected
+
+
+def test_matches_reference():
+    sanitizer = ResponseSanitizer()
+    rng = random.Random(8)
+    for _ in range(500):
+        text = random_text(rng)
+        assert sanitizer.sanitize(text) == reference_sanitize(text), text
+
+
+def test_replacements_are_not_rescanned():
+    # The old five re.sub passes turned this into "bankss"
+    assert ResponseSanitizer().sanitize("our XYZ Bank") == "our banks"
+
+
+def test_stream_equals_whole_text():
+    """Any split into chunks gives the same output as the joined text"""
+    sanitizer = ResponseSanitizer()
+    rng = random.Random(7)
+    for _ in range(500):
+        text = random_text(rng)
+        cuts = [rng.randrange(len(text) + 1) for _ in range(rng.randint(0, 12))]
+        stream = sanitizer.stream()
+        out = "".join(stream.feed(chunk) for chunk in split_at(text, cuts))
+        out += stream.flush()
+        assert out == sanitizer.sanitize(text), (text, cuts)
+
+
+def test_stream_phrase_split_one_char_at_a_time():
+    sanitizer = ResponseSanitizer()
+    stream = sanitizer.stream()
+    text = "Visit our \n bank today"
+    out = "".join(stream.feed(ch) for ch in text) + stream.flush()
+    assert out == "Visit banks today"
+
+
+def test_stream_holds_back_only_possible_prefixes():
+    stream = ResponseSanitizer().stream()
+    assert stream.feed("Banks typically ") == "Banks typically "
+    assert stream.feed("our") == ""  # could become "our bank"
+    assert stream.feed(" savings") == "our savings"
+    assert stream.flush() == ""
@@ -0,0 +1,75 @@
+# token_ledger.py - BANKBOT AI - Gemini token usage per hour and per client
+import threading
+import time
+from collections import OrderedDict
+
+USAGE_FIELDS = {
+    "prompt_tokens": "promptTokenCount",
+    "candidate_tokens": "candidatesTokenCount",
+    "total_tokens": "totalTokenCount",
+}
+
+
+def parse_usage(data):
+    """Pull usageMetadata out of a generateContent response (or chunk)"""
+    usage = (data or {}).get("usageMetadata") or {}
+    if not usage:
+        return None
+    return {field: int(usage.get(key, 0)) for field, key in USAGE_FIELDS.items()}
+
+
+def _empty():
+    return {"requests": 0, "prompt_tokens": 0, "candidate_tokens": 0, "total_tokens": 0}
+
+
+def _add(totals, usage):
+    totals["requests"] += 1
+    for field in USAGE_FIELDS:
+        totals[field] += usage[field]
+
+
+class TokenLedger:
+    """Running token totals, bucketed by UTC hour and by client"""
+
+    def __init__(self, keep_hours=48, max_clients=1000):
+        self.keep_hours = keep_hours
+        self.max_clients = max_clients
+        self._totals = _empty()
+        self._hours = OrderedDict()    # "YYYY-MM-DDTHH:00Z" -> totals
+        self._clients = OrderedDict()  # client id -> totals, LRU
+        self._lock = threading.Lock()
+
+    def record(self, client, usage):
+        if not usage:
+            return
+        hour = time.strftime("%Y-%m-%dT%H:00Z", time.gmtime())
+        with self._lock:
+            _add(self._totals, usage)
+
+            if hour not in self._hours:
+                self._hours[hour] = _empty()
+                while len(self._hours) > self.keep_hours:
+                    self._hours.popitem(last=False)
+            _add(self._hours[hour], usage)
+
+            if client not in self._clients:
+                self._clients[client] = _empty()
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+            _add(self._clients[client], usage)
+
+    def snapshot(self, top=20):
+        with self._lock:
+            totals = dict(self._totals)
+            hours = {h: dict(t) for h, t in self._hours.items()}
+            clients = sorted(self._clients.items(),
+                             key=lambda kv: kv[1]["total_tokens"], reverse=True)[:top]
+        requests = totals["requests"]
+        return {
+            "totals": totals,
+            "avg_prompt_tokens": round(totals["prompt_tokens"] / requests, 1) if requests else 0.0,
+            "by_hour": hours,
+            "top_clients": {client: dict(t) for client, t in clients},
+        }
@@ -1,55 +1,210 @@
 # ai_backend.py - SIMPLE VERSION
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+import json
 from flask_cors import CORS
 import requests
 import time
+import os
+import atexit
+from functools import partial
+from health_prober import HealthProber
+from ollama_pool import OllamaPool
+from model_residency import ResidencyManager
+from cascade import CascadeRouter
+from semantic_cache import SemanticCache
+from scheduler import (AdmissionScheduler, Overloaded, classify, client_key,
+                       PRIORITY_HEADER)
+from cancellation import (RequestCancelled, CancellationStats, request_deadline,
+                          remaining, client_gone)
 
 app = Flask(__name__)
 CORS(app)
 
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Several Ollama hosts, comma separated; requests go to the least busy one
+OLLAMA_URLS = os.getenv("OLLAMA_URLS", OLLAMA_URL).replace(",", " ").split()
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Streaming mode gives up only when Ollama goes this long without sending
+# anything, however long the whole answer takes
+STREAM_CONNECT_TIMEOUT = 3.05
+STREAM_IDLE_TIMEOUT = float(os.getenv("OLLAMA_STREAM_IDLE_TIMEOUT", "30"))
+
+# Total time a caller will wait, unless it sends timeout_ms or the
+# X-Request-Timeout-Ms header; the generation is aborted after that
+DEADLINE_S = float(os.getenv("OLLAMA_DEADLINE", "10"))
+STREAM_DEADLINE_S = float(os.getenv("OLLAMA_STREAM_DEADLINE", "120"))
+MAX_DEADLINE_S = float(os.getenv("OLLAMA_MAX_DEADLINE", "300"))
+NUM_PREDICT = 150
+
+cancellations = CancellationStats(default_expected_tokens=NUM_PREDICT)
+
+# Requests without a model try the small one first when the question looks
+# simple, and go to the large one if its answer doesn't look confident
+LARGE_MODEL = os.getenv("OLLAMA_LARGE_MODEL", "llama3")
+SMALL_MODEL = os.getenv("OLLAMA_SMALL_MODEL", "qwen2.5:0.5b")
+cascade = CascadeRouter(
+    SMALL_MODEL, LARGE_MODEL,
+    enabled=os.getenv("OLLAMA_CASCADE", "1") != "0",
+    max_words=int(os.getenv("OLLAMA_CASCADE_MAX_WORDS", "12")),
+)
+
+# Answers are reused for questions whose embedding is close enough to one
+# already answered; OLLAMA_SEMANTIC_CACHE=1 turns it on. Off by default:
+# the 0.9 threshold has only been checked against the stub's lexical
+# embeddings, and on a general-purpose model opposite questions ("open" /
+# "close a savings account") can score above it. Tune
+# OLLAMA_SEMANTIC_THRESHOLD on the real model before enabling it.
+EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+EMBED_TIMEOUT = float(os.getenv("OLLAMA_EMBED_TIMEOUT", "2"))
+semantic_cache = None
+if os.getenv("OLLAMA_SEMANTIC_CACHE", "0") != "0":
+    semantic_cache = SemanticCache(
+        EMBED_MODEL,
+        threshold=float(os.getenv("OLLAMA_SEMANTIC_THRESHOLD", "0.9")),
+        max_entries=int(os.getenv("OLLAMA_SEMANTIC_MAX_ENTRIES", "2000")),
+        snapshot_path=os.getenv("OLLAMA_SEMANTIC_SNAPSHOT", "semantic_cache.npz") or None,
+    )
+    semantic_cache.load()
+    atexit.register(semantic_cache.save)
+
+# Generations allowed in flight across the pool; the rest wait in the
+# scheduler, interactive before batch before background, users in turn.
+# OLLAMA_SCHEDULER_SLOTS=0 lets everything straight through.
+INTERACTIVE_MAX_WORDS = int(os.getenv("OLLAMA_INTERACTIVE_MAX_WORDS", "30"))
+scheduler = AdmissionScheduler(
+    int(os.getenv("OLLAMA_SCHEDULER_SLOTS", str(2 * len(OLLAMA_URLS)))),
+    max_queue=int(os.getenv("OLLAMA_QUEUE_MAX", "64")),
+)
+# Users take turns by address; behind a reverse proxy set this to the
+# header it overwrites with the caller's (see scheduler.client_key)
+TRUSTED_CLIENT_IP_HEADER = os.getenv("TRUSTED_CLIENT_IP_HEADER", "")
+
+pool = OllamaPool(
+    OLLAMA_URLS,
+    eject_after=int(os.getenv("OLLAMA_EJECT_AFTER", "3")),
+    eject_for=float(os.getenv("OLLAMA_EJECT_SECONDS", "30")),
+    cold_penalty=int(os.getenv("OLLAMA_COLD_PENALTY", "4")),
+)
+
+for host in pool.hosts:
+    # /health answers from this instead of calling Ollama itself; it also
+    # tells the pool which hosts are up and what they have loaded
+    host.prober = HealthProber(
+        host.url,
+        interval=float(os.getenv("OLLAMA_PROBE_INTERVAL", "5")),
+        timeout=float(os.getenv("OLLAMA_PROBE_TIMEOUT", "3")),
+        on_result=partial(pool.probe_result, host),
+    ).start()
+
+    # Preloads models and keeps them resident; unloads idle ones over the budget
+    host.residency = ResidencyManager(
+        host.url,
+        preload=os.getenv("OLLAMA_PRELOAD_MODELS", " ".join(
+            [LARGE_MODEL]
+            + ([SMALL_MODEL] if cascade.enabled else [])
+            + ([EMBED_MODEL] if semantic_cache is not None else [])
+        )).split(),
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        ram_budget_mb=int(os.getenv("OLLAMA_RAM_BUDGET_MB", "0")),
+        interval=float(os.getenv("OLLAMA_RESIDENCY_INTERVAL", "30")),
+        embed_models=[EMBED_MODEL],
+    ).start()
+
+# Simple banking system prompt
+BANKING_PROMPT = """You are NEXA BANK AI assistant. Answer banking questions briefly (2-3 sentences).
+        Focus on: balances, transfers, loans, cards, investments.
+        If not banking, say "I specialize in banking only"."""
+
+
+def build_ollama_request(prompt, model, keep_alive=None, stream=False):
+    return {
+        "model": model,
+        "keep_alive": keep_alive or OLLAMA_KEEP_ALIVE,
+        "messages": [
+            {"role": "system", "content": BANKING_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "stream": stream,
+        "options": {
+            "temperature": 0.3,
+            "num_predict": NUM_PREDICT  # Very short responses
+        }
+    }
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Simple direct proxy to Ollama"""
     try:
         data = request.json
         prompt = data.get('prompt', '')
-        model = data.get('model', 'llama3')
+        model, route = cascade.choose(prompt, data.get('model'))
+        user = client_key(request.headers, request.remote_addr, TRUSTED_CLIENT_IP_HEADER)
+        priority = classify(data.get('priority') or request.headers.get(PRIORITY_HEADER),
+                            prompt, INTERACTIVE_MAX_WORDS)
         
         if not prompt:
             return jsonify({"error": "No query provided"}), 400
+
+        if data.get('stream'):
+            # Streamed tokens can't be taken back, so no confidence check
+            deadline = request_deadline(data, request.headers,
+                                        STREAM_DEADLINE_S, MAX_DEADLINE_S)
+            scheduler.acquire(user, priority, deadline, request.environ)
+            try:
+                return stream_chat(prompt, model, deadline, on_done=scheduler.release)
+            except BaseException:
+                scheduler.release()
+                raise
+
+        deadline = request_deadline(data, request.headers, DEADLINE_S, MAX_DEADLINE_S)
+        start = time.perf_counter()
+        scope = model if route == "direct" else "auto"
+        vector = embed(prompt, deadline) if semantic_cache is not None else None
+        if vector is not None:
+            entry, similarity = semantic_cache.lookup(vector, scope)
+            if entry:
+                return jsonify({
+                    "response": entry["answer"],
+                    "model": entry["model"],
+                    "route": "cache",
+                    "similarity": round(similarity, 3),
+                    "timestamp": time.time()
+                })
+
+        # One slot covers the escalation too, so it doesn't queue twice
+        scheduler.acquire(user, priority, deadline, request.environ)
+        try:
+            body = ask(prompt, model, deadline, request.environ)
+            if route == "small" and (body is None or cascade.needs_escalation(
+                    body["message"]["content"], body.get("done_reason"))):
+                route = "escalated"
+                model = cascade.large_model
+                body = ask(prompt, model, deadline, request.environ)
+        finally:
+            scheduler.release()
         
-        # Simple banking system prompt
-        banking_prompt = """You are NEXA BANK AI assistant. Answer banking questions briefly (2-3 sentences).
-        Focus on: balances, transfers, loans, cards, investments.
-        If not banking, say "I specialize in banking only"."""
-        
-        response = requests.post(
-            'http://localhost:11434/api/chat',
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": banking_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,
-                    "num_predict": 150  # Very short responses
-                }
-            },
-            timeout=10  # Short timeout
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
+        if body is not None:
+            cascade.record(route, time.perf_counter() - start)
+            if vector is not None:
+                semantic_cache.add(vector, prompt, body["message"]["content"], model, scope)
             return jsonify({
-                "response": data["message"]["content"],
+                "response": body["message"]["content"],
                 "model": model,
+                "route": route,
                 "timestamp": time.time()
             })
         else:
             return jsonify({"error": "Ollama error"}), 500
             
+    except Overloaded:
+        return (jsonify({"error": "Too many questions waiting - try again shortly"}),
+                503, {"Retry-After": "5"})
+    except RequestCancelled as e:
+        if e.reason == "disconnect":
+            return "", 499  # nobody is listening; nginx's "client closed request"
+        return jsonify({"error": "Ollama timeout - try simpler question"}), 408
     except requests.exceptions.Timeout:
         return jsonify({"error": "Ollama timeout - try simpler question"}), 408
     except requests.exceptions.ConnectionError:
@@ -57,22 +212,245 @@ def chat():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def embed(text, deadline):
+    """Embedding of text from the pool's embedding model, or None if it
+    can't be had in time (the request then just skips the cache)"""
+    start = time.perf_counter()
+    host = pool.acquire(EMBED_MODEL)
+    keep_alive = host.residency.begin(EMBED_MODEL)
+    body = None
+    failed = False
+    try:
+        response = requests.post(
+            f'{host.url}/api/embed',
+            json={"model": EMBED_MODEL, "input": text, "keep_alive": keep_alive},
+            timeout=(STREAM_CONNECT_TIMEOUT,
+                     max(min(EMBED_TIMEOUT, remaining(deadline)), 0.01))
+        )
+        failed = response.status_code >= 500
+        if response.status_code != 200:
+            return None
+        body = response.json()
+        return body["embeddings"][0]
+    except requests.exceptions.ConnectionError:
+        failed = True
+        return None
+    except (requests.RequestException, ValueError, KeyError, IndexError):
+        return None
+    finally:
+        finish(host, EMBED_MODEL, start, body, failed)
+
+
+def ask(prompt, model, deadline, environ):
+    """Whole answer from the pool: Ollama's done chunk with the message,
+    or None if Ollama answered with an error"""
+    start = time.perf_counter()
+    host, response = open_chat(
+        prompt, model, (STREAM_CONNECT_TIMEOUT, max(remaining(deadline), 0.01))
+    )
+    body = None
+    failed = True
+    try:
+        body = collect_answer(response, model, deadline, environ)
+        failed = response.status_code >= 500
+    except RequestCancelled:
+        failed = False
+        raise
+    finally:
+        finish(host, model, start, body, failed)
+    return body
+
+
+def open_chat(prompt, model, timeout):
+    """Start a streamed Ollama /api/chat on the pool's best host for the model
+
+    A host that can't be reached counts as a failure and the next one is
+    tried. Returns (host, response); the caller must finish() the host.
+    """
+    tried = []
+    while True:
+        host = pool.acquire(model, exclude=tried)
+        keep_alive = host.residency.begin(model)
+        try:
+            return host, requests.post(
+                f'{host.url}/api/chat',
+                json=build_ollama_request(prompt, model, keep_alive, stream=True),
+                timeout=timeout,
+                stream=True
+            )
+        except requests.exceptions.ConnectionError:
+            finish(host, model, 0.0, None, failed=True)
+            tried.append(host)
+            if len(tried) >= len(pool.hosts):
+                raise
+        except Exception:
+            finish(host, model, 0.0, None, failed=True)
+            raise
+
+
+def finish(host, model, start, body, failed):
+    """Release the host and record the outcome (body = Ollama's done chunk)"""
+    host.residency.end(model, time.perf_counter() - start if start else 0.0, body)
+    pool.release(host, ok=not failed, model=model if body else None)
+
+
+def collect_answer(response, model, deadline, environ):
+    """Whole answer for a non-streaming caller, read from a streamed call
+
+    Streaming lets us hang up on Ollama between tokens, which stops the
+    generation, when the deadline passes or the caller disconnects.
+    Returns Ollama's final chunk carrying the joined message, or None if
+    Ollama answered with an error.
+    """
+    parts = []
+    try:
+        if response.status_code != 200:
+            return None
+        for line in response.iter_lines(chunk_size=None):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("done"):
+                cancellations.completed(model, chunk.get("eval_count", len(parts)))
+                chunk["message"] = {"role": "assistant", "content": "".join(parts)}
+                return chunk
+            parts.append(chunk.get("message", {}).get("content", ""))
+            if remaining(deadline) <= 0:
+                raise RequestCancelled("deadline")
+            if client_gone(environ):
+                raise RequestCancelled("disconnect")
+        return None
+    except RequestCancelled as e:
+        cancellations.cancelled(model, e.reason, len(parts))
+        raise
+    except requests.exceptions.RequestException:
+        # The read timeout is the time left, so a stall past it is the deadline
+        if remaining(deadline) > 0:
+            raise
+        cancellations.cancelled(model, "deadline", len(parts))
+        raise RequestCancelled("deadline")
+    finally:
+        response.close()
+
+
+def stream_chat(prompt, model, deadline, on_done=None):
+    """Relay Ollama's NDJSON chunks to the client as they arrive
+
+    Only the current line is held in memory. If Ollama stalls for
+    STREAM_IDLE_TIMEOUT mid-answer, or the deadline passes, a final error
+    line is sent instead; if the client goes away the generation stops.
+    on_done is called once Ollama is finished with, unless this raises.
+    """
+    start = time.perf_counter()
+    host, response = open_chat(
+        prompt, model,
+        (STREAM_CONNECT_TIMEOUT, max(min(STREAM_IDLE_TIMEOUT, remaining(deadline)), 0.01))
+    )
+
+    if response.status_code != 200:
+        response.close()
+        finish(host, model, start, None, failed=response.status_code >= 500)
+        if on_done:
+            on_done()
+        return jsonify({"error": "Ollama error"}), 500
+
+    def relay():
+        last = None
+        tokens = 0
+        failed = False
+        try:
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                if remaining(deadline) <= 0:
+                    cancellations.cancelled(model, "deadline", tokens)
+                    yield json.dumps({"error": "Deadline exceeded", "done": True}).encode() + b"\n"
+                    return
+                yield line + b"\n"
+                last = line
+                tokens += 1
+        except GeneratorExit:
+            # Client went away; closing the response below stops Ollama
+            cancellations.cancelled(model, "disconnect", tokens)
+            raise
+        except requests.exceptions.RequestException:
+            if remaining(deadline) <= 0:
+                cancellations.cancelled(model, "deadline", tokens)
+                yield json.dumps({"error": "Deadline exceeded", "done": True}).encode() + b"\n"
+            else:
+                failed = True
+                yield json.dumps({"error": "Ollama stopped responding", "done": True}).encode() + b"\n"
+        finally:
+            response.close()
+            try:
+                final = json.loads(last) if last else None
+            except ValueError:
+                final = None
+            done = final if final and final.get("done") else None
+            if done:
+                cancellations.completed(model, done.get("eval_count", tokens))
+            finish(host, model, start, done, failed)
+            if on_done:
+                on_done()
+
+    return Response(
+        stream_with_context(relay()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def health_response():
+    """(body, status) for /health from the probers' last results
+
+    Healthy while at least one host is connected with fresh probe data.
+    """
+    snaps = {host.url: host.prober.snapshot() for host in pool.hosts}
+    up = [s for s in snaps.values() if s["ollama"] == "connected" and not s["stale"]]
+    ages = [s["age_s"] for s in snaps.values() if s["age_s"] is not None]
+    body = {
+        "ollama": "connected" if up else "not_connected",
+        "hosts_up": f"{len(up)}/{len(snaps)}",
+        "models": sorted({m for s in up for m in s["models"]}),
+        "loaded_models": sorted({m for s in up for m in s["loaded_models"]}),
+        "probe_latency_ms": min((s["probe_latency_ms"] for s in up), default=None),
+        "age_s": max(ages) if ages else None,
+        "hosts": snaps,
+    }
+    if up:
+        return dict(body, status="ok", message="Ready for banking queries"), 200
+    return dict(body, status="error", message="Start Ollama: ollama run llama3"), 503
+
+
 @app.route('/health', methods=['GET'])
+@app.route('/api/health', methods=['GET'])
 def health():
-    """Simple health check"""
-    try:
-        response = requests.get('http://localhost:11434/api/tags', timeout=3)
-        return jsonify({
-            "status": "ok",
-            "ollama": "connected",
-            "message": "Ready for banking queries"
-        })
-    except:
-        return jsonify({
-            "status": "error",
-            "ollama": "not_connected",
-            "message": "Start Ollama: ollama run llama3"
-        }), 503
+    """Health check from memory; the prober refreshes it in the background"""
+    body, status = health_response()
+    return jsonify(body), status
+
+
+def stats_response():
+    """Proxy counters: admission queue, host routing, model cascade,
+    semantic cache, cancelled generations and tokens saved"""
+    return {
+        "scheduler": scheduler.stats(),
+        "pool": pool.stats(),
+        "cascade": cascade.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "cancellation": cancellations.stats(),
+    }
+
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    return jsonify(stats_response())
+
+
+@app.route('/api/models', methods=['GET'])
+def models():
+    """Residency, RAM budget and cold vs warm latency per model, per host"""
+    return jsonify({"hosts": {host.url: host.residency.stats() for host in pool.hosts}})
 
 if __name__ == '__main__':
     print("Simple Banking AI Backend")
@@ -0,0 +1,301 @@
+# ai_backend_async.py - ASYNC (ASGI) VERSION
+# Same /api/chat and /health contract as ai_backend.py; requests wait on
+# Ollama as coroutines instead of holding an OS thread each.
+#   python ai_backend_async.py
+#   hypercorn ai_backend_async:app --bind 0.0.0.0:5000
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+from quart import Quart, Response, request, jsonify
+
+from ai_backend import (STREAM_CONNECT_TIMEOUT, STREAM_IDLE_TIMEOUT,
+                        DEADLINE_S, STREAM_DEADLINE_S, MAX_DEADLINE_S,
+                        build_ollama_request, health_response, stats_response,
+                        pool, finish, cancellations, cascade, semantic_cache, EMBED_MODEL,
+                        EMBED_TIMEOUT, scheduler, INTERACTIVE_MAX_WORDS,
+                        TRUSTED_CLIENT_IP_HEADER)
+from cancellation import RequestCancelled, request_deadline, remaining
+from scheduler import Overloaded, classify, client_key, PRIORITY_HEADER
+
+app = Quart(__name__)
+
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "500"))
+
+session = None
+
+
+@app.before_serving
+async def start_session():
+    global session
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=OLLAMA_MAX_CONNECTIONS)
+    )
+
+
+@app.after_serving
+async def close_session():
+    await session.close()
+
+
+@app.after_request
+async def add_cors_headers(response):
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    return response
+
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    """Simple direct proxy to Ollama"""
+    try:
+        data = await request.get_json(silent=True) or {}
+        prompt = data.get('prompt', '')
+        model, route = cascade.choose(prompt, data.get('model'))
+        user = client_key(request.headers, request.remote_addr, TRUSTED_CLIENT_IP_HEADER)
+        priority = classify(data.get('priority') or request.headers.get(PRIORITY_HEADER),
+                            prompt, INTERACTIVE_MAX_WORDS)
+
+        if not prompt:
+            return jsonify({"error": "No query provided"}), 400
+
+        if data.get('stream'):
+            deadline = request_deadline(data, request.headers,
+                                        STREAM_DEADLINE_S, MAX_DEADLINE_S)
+            await scheduler.acquire_async(user, priority, deadline)
+            try:
+                return await stream_chat(prompt, model, deadline,
+                                         on_done=scheduler.release)
+            except BaseException:
+                scheduler.release()
+                raise
+
+        deadline = request_deadline(data, request.headers, DEADLINE_S, MAX_DEADLINE_S)
+        start = time.perf_counter()
+        scope = model if route == "direct" else "auto"
+        vector = await embed(prompt, deadline) if semantic_cache is not None else None
+        if vector is not None:
+            entry, similarity = semantic_cache.lookup(vector, scope)
+            if entry:
+                return jsonify({
+                    "response": entry["answer"],
+                    "model": entry["model"],
+                    "route": "cache",
+                    "similarity": round(similarity, 3),
+                    "timestamp": time.time()
+                })
+
+        await scheduler.acquire_async(user, priority, deadline)
+        try:
+            body = await ask(prompt, model, deadline)
+            if route == "small" and (body is None or cascade.needs_escalation(
+                    body["message"]["content"], body.get("done_reason"))):
+                route = "escalated"
+                model = cascade.large_model
+                body = await ask(prompt, model, deadline)
+        finally:
+            scheduler.release()
+
+        if body is not None:
+            cascade.record(route, time.perf_counter() - start)
+            if vector is not None:
+                semantic_cache.add(vector, prompt, body["message"]["content"], model, scope)
+            return jsonify({
+                "response": body["message"]["content"],
+                "model": model,
+                "route": route,
+                "timestamp": time.time()
+            })
+        return jsonify({"error": "Ollama error"}), 500
+
+    except Overloaded:
+        return (jsonify({"error": "Too many questions waiting - try again shortly"}),
+                503, {"Retry-After": "5"})
+    except (asyncio.TimeoutError, RequestCancelled):
+        return jsonify({"error": "Ollama timeout - try simpler question"}), 408
+    except aiohttp.ClientConnectionError:
+        return jsonify({"error": "Ollama not running - start with: ollama run llama3"}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+async def embed(text, deadline):
+    """Embedding of text, or None; see ai_backend.embed"""
+    start = time.perf_counter()
+    host = pool.acquire(EMBED_MODEL)
+    keep_alive = host.residency.begin(EMBED_MODEL)
+    body = None
+    failed = False
+    try:
+        async with session.post(
+            f'{host.url}/api/embed',
+            json={"model": EMBED_MODEL, "input": text, "keep_alive": keep_alive},
+            timeout=aiohttp.ClientTimeout(
+                total=max(min(EMBED_TIMEOUT, remaining(deadline)), 0.01),
+                connect=STREAM_CONNECT_TIMEOUT)
+        ) as response:
+            failed = response.status >= 500
+            if response.status != 200:
+                return None
+            body = await response.json()
+            return body["embeddings"][0]
+    except aiohttp.ClientConnectionError:
+        failed = True
+        return None
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, IndexError):
+        return None
+    finally:
+        finish(host, EMBED_MODEL, start, body, failed)
+
+
+async def open_chat(prompt, model, deadline, stream=False, **timeouts):
+    """Start an Ollama /api/chat on the pool's best host for the model; see
+    ai_backend.open_chat
+
+    A host that can't be reached counts as a failure and the next one is
+    tried. Returns (host, response); the caller must finish() the host
+    and close the response.
+    """
+    tried = []
+    while True:
+        host = pool.acquire(model, exclude=tried)
+        keep_alive = host.residency.begin(model)
+        try:
+            return host, await session.post(
+                f'{host.url}/api/chat',
+                json=build_ollama_request(prompt, model, keep_alive, stream=stream),
+                timeout=aiohttp.ClientTimeout(total=max(remaining(deadline), 0.01),
+                                              **timeouts)
+            )
+        except aiohttp.ClientConnectionError:
+            finish(host, model, 0.0, None, failed=True)
+            tried.append(host)
+            if len(tried) >= len(pool.hosts):
+                raise
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Out of time or the client left; says nothing about the host
+            finish(host, model, 0.0, None, failed=False)
+            raise
+        except BaseException:
+            finish(host, model, 0.0, None, failed=True)
+            raise
+
+
+async def ask(prompt, model, deadline):
+    """Ollama's whole answer, or None if it answered with an error
+
+    Read as a stream, like ai_backend.collect_answer, so a cancelled
+    answer is counted by the tokens Ollama had already sent.
+    """
+    # The server cancels this task when the client disconnects; closing
+    # the response then drops the connection and Ollama stops
+    start = time.perf_counter()
+    body = None
+    failed = True
+    host = None
+    parts = []
+    try:
+        host, response = await open_chat(prompt, model, deadline, stream=True)
+        async with response:
+            failed = response.status >= 500
+            if response.status == 200:
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("done"):
+                        cancellations.completed(model, chunk.get("eval_count", len(parts)))
+                        chunk["message"] = {"role": "assistant", "content": "".join(parts)}
+                        body = chunk
+                        break
+                    parts.append(chunk.get("message", {}).get("content", ""))
+    except asyncio.TimeoutError:
+        failed = False
+        cancellations.cancelled(model, "deadline", len(parts))
+        raise
+    except asyncio.CancelledError:
+        failed = False
+        cancellations.cancelled(model, "disconnect", len(parts))
+        raise
+    finally:
+        if host is not None:
+            finish(host, model, start, body, failed)
+    return body
+
+
+async def stream_chat(prompt, model, deadline, on_done=None):
+    """Relay Ollama's NDJSON chunks as they arrive; see ai_backend.stream_chat"""
+    start = time.perf_counter()
+    host, response = await open_chat(prompt, model, deadline, stream=True,
+                                     connect=STREAM_CONNECT_TIMEOUT,
+                                     sock_read=STREAM_IDLE_TIMEOUT)
+
+    if response.status != 200:
+        response.release()
+        finish(host, model, start, None, failed=response.status >= 500)
+        if on_done:
+            on_done()
+        return jsonify({"error": "Ollama error"}), 500
+
+    async def relay():
+        last = None
+        tokens = 0
+        failed = False
+        try:
+            async for line in response.content:
+                line = line.strip()
+                if not line:
+                    continue
+                yield line + b"\n"
+                last = line
+                tokens += 1
+        except (GeneratorExit, asyncio.CancelledError):
+            cancellations.cancelled(model, "disconnect", tokens)
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if remaining(deadline) <= 0:
+                cancellations.cancelled(model, "deadline", tokens)
+                yield json.dumps({"error": "Deadline exceeded", "done": True}).encode() + b"\n"
+            else:
+                failed = True
+                yield json.dumps({"error": "Ollama stopped responding", "done": True}).encode() + b"\n"
+        finally:
+            # close(), not release(): an unfinished generation must be cut off
+            response.close()
+            try:
+                final = json.loads(last) if last else None
+            except ValueError:
+                final = None
+            done = final if final and final.get("done") else None
+            if done:
+                cancellations.completed(model, done.get("eval_count", tokens))
+            finish(host, model, start, done, failed)
+            if on_done:
+                on_done()
+
+    return Response(relay(), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/health', methods=['GET'])
+@app.route('/api/health', methods=['GET'])
+async def health():
+    """Health check from memory; the prober refreshes it in the background"""
+    body, status = health_response()
+    return jsonify(body), status
+
+
+@app.route('/api/stats', methods=['GET'])
+async def stats():
+    """Same counters as the threaded proxy's /api/stats"""
+    return jsonify(stats_response())
+
+
+if __name__ == '__main__':
+    print("Simple Banking AI Backend (async)")
+    print("Port: 5000")
+    print("Make sure Ollama is running: ollama run llama3")
+    app.run(host='0.0.0.0', port=5000, debug=False)
@@ -61,7 +61,8 @@ with st.sidebar:
                 
                 if response.status_code == 200:
                     data = response.json()
-                    st.success(f"✅ Online - {data['ping_ms']}ms")
+                    st.success(f"✅ Online - Ollama {data['probe_latency_ms']}ms, "
+                               f"checked {data['age_s']:.1f}s ago")
                 else:
                     st.error("❌ Backend Error")
             except:
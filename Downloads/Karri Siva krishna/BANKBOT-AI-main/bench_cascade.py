@@ -0,0 +1,177 @@
+# bench_cascade.py - latency and llama3 load with and without the model cascade
+#
+# Replays a query log through the threaded proxy twice against a stub
+# Ollama where the small model is faster than llama3 and answers "I'm not
+# sure" to some questions: once with every question going to llama3
+# (OLLAMA_CASCADE=0), once with the cascade on.
+#   python bench_cascade.py
+#   python bench_cascade.py --log queries.txt --large-latency 2 --small-latency 0.3
+# --log takes one question per line, or a chat_history.json from the
+# Streamlit bots ({"sessions": [{"messages": [["user", ...], ...]}]}).
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+import requests
+
+import ollama_stub
+from bench_concurrency import BACKEND_URL, wait_for_backend
+from model_residency import model_key
+
+LARGE, SMALL = "llama3", "qwen2.5:0.5b"
+
+# Questions in the style the bots in this repo get
+QUERY_LOG = [
+    "what is IFSC",
+    "what is IFSC code",
+    "how do I block my debit card",
+    "what is UPI",
+    "how to open a savings account",
+    "what is KYC",
+    "my card is lost",
+    "how to check balance",
+    "what is NEFT",
+    "what is RTGS",
+    "what is IMPS",
+    "how to reset net banking password",
+    "what documents are needed for a home loan",
+    "what is a fixed deposit",
+    "what is a recurring deposit",
+    "how do I activate my credit card",
+    "what is a cheque book",
+    "how to update my mobile number",
+    "what is minimum balance",
+    "what is CIBIL score",
+    "explain the difference between NEFT, RTGS and IMPS",
+    "compare a fixed deposit and a recurring deposit for a 3 year goal",
+    "calculate the EMI on a 20 lakh home loan at 8.5% for 20 years",
+    "should I prepay my car loan or invest the money in a mutual fund?",
+    "why was my loan application rejected even though my salary is good?",
+    "how much interest will I earn on 1 lakh in a savings account in a year",
+    "what are the pros and cons of a credit card with an annual fee",
+    "explain how credit card interest works when I pay only the minimum due",
+    "I transferred money to the wrong account yesterday. What can I do and how long will it take?",
+    "plan my monthly budget with a 50k salary and a 15k loan EMI",
+]
+
+
+def load_log(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return [msg for session in json.load(f).get("sessions", [])
+                    for role, msg in session.get("messages", []) if role == "user"]
+        return [line.strip() for line in f if line.strip()]
+
+
+async def replay(queries, concurrency):
+    queue = iter(queries)
+    latencies, routes, failures = [], {}, 0
+    async with aiohttp.ClientSession() as client:
+        async def worker():
+            nonlocal failures
+            for prompt in queue:
+                start = time.perf_counter()
+                try:
+                    async with client.post(f"{BACKEND_URL}/api/chat",
+                                           json={"prompt": prompt, "timeout_ms": 60000}) as r:
+                        body = await r.json()
+                        if r.status != 200:
+                            failures += 1
+                            continue
+                except aiohttp.ClientError:
+                    failures += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                route = body.get("route", "large")
+                routes[route] = routes.get(route, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return sorted(latencies), routes, failures, time.perf_counter() - start
+
+
+def run(label, cascade_on, queries, args):
+    env = dict(os.environ, OLLAMA_URL=f"http://127.0.0.1:{args.port}",
+               OLLAMA_CASCADE="1" if cascade_on else "0", OLLAMA_PRELOAD_MODELS="",
+               OLLAMA_SEMANTIC_CACHE="0")
+    proc = subprocess.Popen([sys.executable, "ai_backend.py"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_backend():
+            print("❌ backend did not start")
+            return None
+        latencies, routes, failures, elapsed = asyncio.run(
+            replay(queries * args.repeat, args.concurrency))
+        hosts = requests.get(f"{BACKEND_URL}/api/models", timeout=5).json()["hosts"]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    # /api/models lists models by their tagged names ("llama3:latest")
+    calls = {LARGE: 0, SMALL: 0}
+    tags = {model_key(name): name for name in calls}
+    for host in hosts.values():
+        for name, model in host["models"].items():
+            name = tags.get(name, name)
+            calls[name] = calls.get(name, 0) + model["requests"]
+    n = len(latencies)
+    return {
+        "label": label,
+        "ok": n,
+        "failed": failures,
+        "elapsed_s": elapsed,
+        "mean_ms": sum(latencies) / n * 1000 if n else 0.0,
+        "p50_ms": latencies[n // 2] * 1000 if n else 0.0,
+        "p95_ms": latencies[min(n - 1, int(n * 0.95))] * 1000 if n else 0.0,
+        "large_calls": calls[LARGE],
+        "small_calls": calls[SMALL],
+        # Model time spent generating, from the stub's per-model latency
+        "gen_s": calls[LARGE] * args.large_latency + calls[SMALL] * args.small_latency,
+        "routes": routes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log", help="query log: text, one per line, or chat_history.json")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--large-latency", type=float, default=1.5)
+    parser.add_argument("--small-latency", type=float, default=0.25)
+    parser.add_argument("--unsure", type=float, default=0.15,
+                        help="share of questions the small model isn't sure about")
+    parser.add_argument("--port", type=int, default=11436)
+    args = parser.parse_args()
+
+    queries = load_log(args.log) if args.log else QUERY_LOG
+    ollama_stub.serve(args.port, args.large_latency, (LARGE, SMALL),
+                      model_latency={SMALL: args.small_latency},
+                      unsure={SMALL: args.unsure})
+
+    print(f"⏱️  replaying {len(queries) * args.repeat} questions "
+          f"(llama3 {args.large_latency}s, {SMALL} {args.small_latency}s) ...")
+    rows = [r for r in (run("llama3 only", False, queries, args),
+                        run("cascade", True, queries, args)) if r]
+
+    print("=" * 86)
+    print(f"{'':12} {'ok':>4} {'fail':>4} {'wall s':>7} {'mean ms':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'llama3':>6} {'small':>6} {'gen s':>6}  routes")
+    for r in rows:
+        print(f"{r['label']:12} {r['ok']:4d} {r['failed']:4d} {r['elapsed_s']:7.1f} "
+              f"{r['mean_ms']:8.0f} {r['p50_ms']:8.0f} {r['p95_ms']:8.0f} "
+              f"{r['large_calls']:6d} {r['small_calls']:6d} {r['gen_s']:6.1f}  {r['routes']}")
+    if len(rows) == 2:
+        base, cascade = rows
+        print(f"mean latency {1 - cascade['mean_ms'] / (base['mean_ms'] or 1):.0%} saved, "
+              f"llama3 calls {base['large_calls']} → {cascade['large_calls']}, "
+              f"model time {1 - cascade['gen_s'] / (base['gen_s'] or 1):.0%} saved")
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# bench_concurrency.py - threaded Flask vs async proxy with a slow Ollama
+#
+# Starts a stub Ollama, runs each backend in turn on port 5000 and fires
+# N concurrent /api/chat requests at it.
+#   python bench_concurrency.py --concurrency 300 --latency 2
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import aiohttp
+import requests
+
+import ollama_stub
+
+BACKEND_URL = "http://127.0.0.1:5000"
+MODES = {"threaded": "ai_backend.py", "async": "ai_backend_async.py"}
+
+
+def read_proc_status(pid):
+    """(rss_mb, threads) from /proc - Linux only"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["Threads"])
+    except (OSError, KeyError, ValueError):
+        return 0.0, 0
+
+
+def wait_for_backend(timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{BACKEND_URL}/health", timeout=1)
+            return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+async def fire(concurrency):
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        async def one(i):
+            start = time.perf_counter()
+            try:
+                async with client.post(f"{BACKEND_URL}/api/chat",
+                                       json={"prompt": f"Question {i}"}) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(concurrency)))
+        return results, time.perf_counter() - start
+
+
+def run_mode(mode, concurrency, ollama_url):
+    # Every request goes to llama3 and is generated: no cascade, no cache
+    env = dict(os.environ, OLLAMA_URL=ollama_url, OLLAMA_CASCADE="0",
+               OLLAMA_SEMANTIC_CACHE="0")
+    proc = subprocess.Popen([sys.executable, MODES[mode]], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    peak = [0.0, 0]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            rss, threads = read_proc_status(proc.pid)
+            peak[0], peak[1] = max(peak[0], rss), max(peak[1], threads)
+            time.sleep(0.05)
+
+    try:
+        if not wait_for_backend():
+            print(f"❌ {mode}: backend did not start")
+            return None
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        results, elapsed = asyncio.run(fire(concurrency))
+        stop.set()
+        sampler.join()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = sorted(t for ok, t in results if ok)
+    n = len(latencies)
+    p99 = latencies[min(n - 1, int(n * 0.99))] * 1000 if n else 0.0
+    return (mode, n, len(results) - n, elapsed, n / elapsed, p99, peak[0], peak[1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--stub-port", type=int, default=11435)
+    args = parser.parse_args()
+
+    ollama_stub.serve(args.stub_port, args.latency)
+    ollama_url = f"http://127.0.0.1:{args.stub_port}"
+
+    rows = []
+    for mode in MODES:
+        print(f"⏱️  {mode}: {args.concurrency} concurrent requests ...")
+        row = run_mode(mode, args.concurrency, ollama_url)
+        if row:
+            rows.append(row)
+
+    print("=" * 76)
+    print(f"{'mode':10} {'ok':>5} {'fail':>5} {'wall s':>8} {'req/s':>8} "
+          f"{'p99 ms':>9} {'RSS MB':>8} {'threads':>8}")
+    for row in rows:
+        print("{:10} {:5d} {:5d} {:8.2f} {:8.1f} {:9.1f} {:8.1f} {:8d}".format(*row))
+    print("=" * 76)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# bench_pool.py - proxy throughput as the Ollama pool grows
+#
+# Starts --hosts stub Ollama servers, each running --parallel generations
+# at a time like a real Ollama, then runs the threaded proxy against the
+# first 1, 2, 4 ... of them and keeps --concurrency requests in flight.
+# Every other request asks for a second model that only half the hosts
+# have loaded, to show model-aware routing avoiding cold loads.
+#   python bench_pool.py --hosts 4 --requests 200 --concurrency 32
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+import requests
+
+import ollama_stub
+from bench_concurrency import BACKEND_URL, wait_for_backend
+
+MODELS = ("llama3", "qwen2.5:0.5b")
+
+
+async def fire(total, concurrency):
+    queue = iter(range(total))
+    latencies, failures = [], 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        async def worker():
+            nonlocal failures
+            for i in queue:
+                start = time.perf_counter()
+                try:
+                    async with client.post(
+                        f"{BACKEND_URL}/api/chat",
+                        json={"prompt": f"Question {i}", "model": MODELS[i % 2],
+                              "timeout_ms": 120000}
+                    ) as response:
+                        await response.read()
+                        if response.status != 200:
+                            failures += 1
+                            continue
+                except aiohttp.ClientError:
+                    failures += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return sorted(latencies), failures, time.perf_counter() - start
+
+
+def run(urls, args):
+    env = dict(os.environ, OLLAMA_URLS=",".join(urls), OLLAMA_PRELOAD_MODELS="",
+               OLLAMA_PROBE_INTERVAL="0.5", OLLAMA_SEMANTIC_CACHE="0")
+    proc = subprocess.Popen([sys.executable, "ai_backend.py"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_backend():
+            print("❌ backend did not start")
+            return None
+        time.sleep(1.0)  # let the first probes report loaded models
+        latencies, failures, elapsed = asyncio.run(fire(args.requests, args.concurrency))
+        pool = requests.get(f"{BACKEND_URL}/api/stats", timeout=5).json()["pool"]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    n = len(latencies)
+    return {
+        "hosts": len(urls),
+        "ok": n,
+        "failed": failures,
+        "rps": n / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[n // 2] * 1000 if n else 0.0,
+        "p99_ms": latencies[min(n - 1, int(n * 0.99))] * 1000 if n else 0.0,
+        "cold": pool["routed_cold"],
+        "spread": [h["requests"] for h in pool["hosts"].values()],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--load-time", type=float, default=2.0)
+    parser.add_argument("--parallel", type=int, default=2,
+                        help="generations each stub runs at once")
+    parser.add_argument("--base-port", type=int, default=11500)
+    args = parser.parse_args()
+
+    urls = []
+    for i in range(args.hosts):
+        port = args.base_port + i
+        # llama3 everywhere; the second model only on even hosts
+        ollama_stub.serve(port, args.latency, MODELS, load_time=args.load_time,
+                          preloaded=MODELS if i % 2 == 0 else MODELS[:1],
+                          parallel=args.parallel)
+        urls.append(f"http://127.0.0.1:{port}")
+
+    sizes = []
+    size = 1
+    while size < args.hosts:
+        sizes.append(size)
+        size *= 2
+    sizes.append(args.hosts)
+
+    rows = []
+    for size in sizes:
+        print(f"⏱️  {size} host(s): {args.requests} requests, "
+              f"concurrency {args.concurrency} ...")
+        row = run(urls[:size], args)
+        if row:
+            rows.append(row)
+
+    print("=" * 78)
+    print(f"{'hosts':>5} {'ok':>5} {'fail':>5} {'req/s':>8} {'p50 ms':>9} "
+          f"{'p99 ms':>9} {'cold':>5}  requests per host")
+    for r in rows:
+        print(f"{r['hosts']:5d} {r['ok']:5d} {r['failed']:5d} {r['rps']:8.1f} "
+              f"{r['p50_ms']:9.1f} {r['p99_ms']:9.1f} {r['cold']:5d}  {r['spread']}")
+    if rows:
+        base = rows[0]["rps"] or 1
+        print("speedup vs 1 host: " + ", ".join(
+            f"{r['hosts']}→{r['rps'] / base:.1f}x" for r in rows))
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
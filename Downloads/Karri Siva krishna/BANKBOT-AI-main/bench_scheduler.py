@@ -0,0 +1,117 @@
+# bench_scheduler.py - short questions behind one user's long backlog
+#
+# A stub Ollama that runs one generation at a time (like a single model
+# on one GPU). One user fires --backlog long questions at once; a moment
+# later --users other users each ask a short question every --gap
+# seconds. Runs the threaded proxy with the scheduler off
+# (OLLAMA_SCHEDULER_SLOTS=0: Ollama's arrival order) and on. Users are
+# told apart by address, so each sends its own X-Real-IP, which the proxy
+# is told to trust.
+#   python bench_scheduler.py --backlog 20 --queue-max 8 --latency 1
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+import requests
+
+import ollama_stub
+from bench_concurrency import BACKEND_URL, wait_for_backend
+
+LONG_QUESTION = ("I am preparing a detailed review of my household finances and would like "
+                 "you to go through every account type, loan, card and deposit I might "
+                 "hold and describe in detail how each one is charged and taxed, number {i}")
+SHORT_QUESTION = "what is IFSC code, asked by user {u} round {r}"
+
+
+async def ask(client, prompt, address, results, kind):
+    start = time.perf_counter()
+    try:
+        async with client.post(f"{BACKEND_URL}/api/chat",
+                               json={"prompt": prompt, "timeout_ms": 120000},
+                               headers={"X-Real-IP": address}) as response:
+            await response.read()
+            status = response.status
+    except aiohttp.ClientError:
+        status = 0
+    results.append((kind, status, time.perf_counter() - start))
+
+
+async def scenario(args):
+    results = []
+    async with aiohttp.ClientSession() as client:
+        tasks = [asyncio.create_task(ask(client, LONG_QUESTION.format(i=i), "10.0.0.1",
+                                         results, "batch"))
+                 for i in range(args.backlog)]
+        await asyncio.sleep(0.3)
+        for r in range(args.rounds):
+            tasks += [asyncio.create_task(ask(client, SHORT_QUESTION.format(u=u, r=r),
+                                              f"10.0.1.{u}", results, "interactive"))
+                      for u in range(args.users)]
+            await asyncio.sleep(args.gap)
+        await asyncio.gather(*tasks)
+    return results
+
+
+def run(label, slots, args):
+    env = dict(os.environ, OLLAMA_URL=f"http://127.0.0.1:{args.port}",
+               OLLAMA_SCHEDULER_SLOTS=str(slots), OLLAMA_QUEUE_MAX=str(args.queue_max),
+               OLLAMA_CASCADE="0", OLLAMA_SEMANTIC_CACHE="0", OLLAMA_PRELOAD_MODELS="",
+               OLLAMA_DEADLINE="120", TRUSTED_CLIENT_IP_HEADER="X-Real-IP")
+    proc = subprocess.Popen([sys.executable, "ai_backend.py"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_backend():
+            print("❌ backend did not start")
+            return None
+        results = asyncio.run(scenario(args))
+        stats = requests.get(f"{BACKEND_URL}/api/stats", timeout=5).json()["scheduler"]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    row = {"label": label, "max_depth": stats["max_depth"]}
+    for kind in ("interactive", "batch"):
+        ok = sorted(s for k, status, s in results if k == kind and status == 200)
+        row[kind] = {
+            "ok": len(ok),
+            "busy": sum(1 for k, status, _ in results if k == kind and status == 503),
+            "p50": ok[len(ok) // 2] if ok else 0.0,
+            "p95": ok[min(len(ok) - 1, int(len(ok) * 0.95))] if ok else 0.0,
+            "max": ok[-1] if ok else 0.0,
+        }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backlog", type=int, default=10)
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--gap", type=float, default=4.0, help="seconds between rounds")
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--queue-max", type=int, default=16)
+    parser.add_argument("--port", type=int, default=11438)
+    args = parser.parse_args()
+
+    ollama_stub.serve(args.port, args.latency, ("llama3",), parallel=1)
+    print(f"⏱️  {args.backlog} long questions from one user, then {args.users} users x "
+          f"{args.rounds} short ones; one generation at a time, {args.latency}s each")
+    rows = [r for r in (run("off", 0, args), run("scheduler", 1, args)) if r]
+
+    print("=" * 84)
+    print(f"{'':10} {'interactive: ok':>15} {'503':>4} {'p50 s':>6} {'p95 s':>6} {'max s':>6}"
+          f" | {'batch: ok':>9} {'503':>4} {'p50 s':>6} {'max s':>6} | depth")
+    for r in rows:
+        i, b = r["interactive"], r["batch"]
+        print(f"{r['label']:10} {i['ok']:15d} {i['busy']:4d} {i['p50']:6.1f} {i['p95']:6.1f} "
+              f"{i['max']:6.1f} | {b['ok']:9d} {b['busy']:4d} {b['p50']:6.1f} {b['max']:6.1f}"
+              f" | {r['max_depth']:5d}")
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
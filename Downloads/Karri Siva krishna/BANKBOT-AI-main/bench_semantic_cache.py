@@ -0,0 +1,138 @@
+# bench_semantic_cache.py - semantic cache hit ratio and lookup cost
+#
+# 1. Index only: cosine search over --entries random 768-d vectors (the
+#    size nomic-embed-text returns), the cost added to every request.
+# 2. End to end: a stub Ollama (llama3 --latency, embeddings 10 ms) and
+#    the threaded proxy with the cache on. Replays groups of paraphrased
+#    questions, restarts the proxy, and replays again to show the
+#    snapshot bringing the answers back.
+#   python bench_semantic_cache.py --entries 2000 10000 --latency 1.5
+# The stub's embeddings are lexical (see ollama_stub.py), so the
+# paraphrases here differ in word order and filler words; a real
+# embedding model also matches synonyms. For the same reason the 0.9
+# threshold says nothing about a real model, which is why the proxy
+# leaves the cache off unless OLLAMA_SEMANTIC_CACHE=1.
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import requests
+
+import ollama_stub
+from bench_concurrency import BACKEND_URL, wait_for_backend
+from semantic_cache import SemanticCache
+
+PARAPHRASES = [
+    ["how do I get a cheque book", "cheque book - how can I get one?",
+     "I want to get a cheque book", "get cheque book"],
+    ["how to block my debit card", "block debit card please",
+     "I need to block my debit card", "Debit card block: how?"],
+    ["what is the IFSC code", "IFSC code meaning", "what does IFSC code mean"],
+    ["how to reset net banking password", "reset my net banking password",
+     "net banking password reset"],
+    ["what documents are required for a home loan",
+     "home loan documents required", "documents required for home loan?"],
+    ["how to update my mobile number in the bank",
+     "update mobile number bank", "I want to update my bank mobile number"],
+    ["what is the minimum balance for a savings account",
+     "savings account minimum balance", "minimum balance savings account?"],
+]
+
+
+def bench_index(entries, dim=768, lookups=2000):
+    rng = np.random.default_rng(0)
+    cache = SemanticCache("bench", threshold=0.9, max_entries=entries)
+    vectors = rng.standard_normal((entries, dim)).astype(np.float32)
+    for i, vector in enumerate(vectors):
+        cache.add(vector, f"q{i}", "answer", "llama3", "auto")
+    # Half near-duplicates of stored questions (hits), half new ones (misses)
+    queries = np.concatenate([
+        vectors[rng.integers(0, entries, lookups // 2)]
+        + 0.05 * rng.standard_normal((lookups // 2, dim)).astype(np.float32),
+        rng.standard_normal((lookups // 2, dim)).astype(np.float32),
+    ])
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        cache.lookup(query, "auto")
+        times.append(time.perf_counter() - start)
+    times.sort()
+    stats = cache.stats()
+    return {
+        "entries": entries,
+        "p50_us": times[len(times) // 2] * 1e6,
+        "p99_us": times[int(len(times) * 0.99)] * 1e6,
+        "hit_ratio": stats["hit_ratio"],
+        "evictions": stats["evictions"],
+    }
+
+
+def replay(label):
+    rows = []
+    for group in PARAPHRASES:
+        for question in group:
+            start = time.perf_counter()
+            body = requests.post(f"{BACKEND_URL}/api/chat",
+                                 json={"prompt": question, "timeout_ms": 60000},
+                                 timeout=60).json()
+            rows.append((body.get("route"), time.perf_counter() - start))
+    hits = [s for route, s in rows if route == "cache"]
+    misses = [s for route, s in rows if route != "cache"]
+    print(f"  {label:14} {len(rows):3d} questions, {len(hits):3d} from cache, "
+          f"hit {np.mean(hits) * 1000 if hits else 0:7.1f} ms, "
+          f"miss {np.mean(misses) * 1000 if misses else 0:7.1f} ms, "
+          f"total {sum(s for _, s in rows):5.1f} s")
+
+
+def start_backend(env):
+    proc = subprocess.Popen([sys.executable, "ai_backend.py"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_backend():
+        proc.kill()
+        raise SystemExit("❌ backend did not start")
+    return proc
+
+
+def stop_backend(proc):
+    # SIGINT, not SIGTERM, so the exit hook writes the snapshot
+    proc.send_signal(signal.SIGINT)
+    proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, nargs="+", default=[2000, 10000])
+    parser.add_argument("--latency", type=float, default=1.5)
+    parser.add_argument("--port", type=int, default=11437)
+    args = parser.parse_args()
+
+    print("⏱️  index lookups (768-d, threshold 0.9)")
+    for entries in args.entries:
+        r = bench_index(entries)
+        print(f"  {r['entries']:6d} entries: p50 {r['p50_us']:7.1f} µs, "
+              f"p99 {r['p99_us']:7.1f} µs, hit ratio {r['hit_ratio']}")
+
+    ollama_stub.serve(args.port, args.latency, ("llama3", "nomic-embed-text"))
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, OLLAMA_URL=f"http://127.0.0.1:{args.port}",
+                   OLLAMA_CASCADE="0", OLLAMA_PRELOAD_MODELS="", OLLAMA_SEMANTIC_CACHE="1",
+                   OLLAMA_SEMANTIC_SNAPSHOT=os.path.join(tmp, "cache.npz"))
+        print(f"⏱️  proxy with llama3 at {args.latency}s")
+        proc = start_backend(env)
+        replay("cold cache")
+        stats = requests.get(f"{BACKEND_URL}/api/stats", timeout=5).json()["semantic_cache"]
+        stop_backend(proc)
+
+        proc = start_backend(env)
+        replay("after restart")
+        stop_backend(proc)
+    print(f"  search {stats['search']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# cancellation.py - request deadlines and client-disconnect detection
+#
+# Ollama stops generating when the connection to it is closed, so the
+# proxy aborts a generation by closing its upstream response as soon as
+# the caller's deadline passes or the caller goes away.
+import socket
+import threading
+import time
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+MIN_DEADLINE_S = 0.1
+
+
+class RequestCancelled(Exception):
+    """Generation abandoned, because of the deadline or a disconnect"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def request_deadline(data, headers, default_s, max_s):
+    """Monotonic deadline from the body's timeout_ms, the header, or the default"""
+    raw = data.get('timeout_ms') or headers.get(DEADLINE_HEADER)
+    try:
+        budget = float(raw) / 1000 if raw else default_s
+    except (TypeError, ValueError):
+        budget = default_s
+    return time.monotonic() + min(max(budget, MIN_DEADLINE_S), max_s)
+
+
+def remaining(deadline):
+    return deadline - time.monotonic()
+
+
+def client_gone(environ):
+    """True once the caller has closed its connection
+
+    Needs the raw socket, which the Werkzeug server (app.run) puts in the
+    environ; other servers report False and rely on write failures.
+    """
+    sock = environ.get("werkzeug.socket")
+    if sock is None:
+        return False
+    try:
+        # Peer closed: recv returns b"". Alive and idle: nothing to read.
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+
+
+class CancellationStats:
+    """How often generations were cut short and what that saved
+
+    Tokens saved is an estimate: the model's average eval_count on
+    completed answers minus what it had produced when we hung up.
+    """
+
+    def __init__(self, default_expected_tokens=150):
+        self.default_expected_tokens = default_expected_tokens
+        self._lock = threading.Lock()
+        self._completed = {}  # model -> (answers, total eval_count)
+        self.deadline_exceeded = 0
+        self.client_disconnected = 0
+        self.tokens_generated_discarded = 0
+        self.tokens_saved = 0
+
+    def completed(self, model, eval_count):
+        with self._lock:
+            answers, tokens = self._completed.get(model, (0, 0))
+            self._completed[model] = (answers + 1, tokens + eval_count)
+
+    def expected_tokens(self, model):
+        answers, tokens = self._completed.get(model, (0, 0))
+        return tokens / answers if answers else self.default_expected_tokens
+
+    def cancelled(self, model, reason, tokens_so_far):
+        with self._lock:
+            if reason == "deadline":
+                self.deadline_exceeded += 1
+            else:
+                self.client_disconnected += 1
+            self.tokens_generated_discarded += tokens_so_far
+            self.tokens_saved += int(max(0, self.expected_tokens(model) - tokens_so_far))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "deadline_exceeded": self.deadline_exceeded,
+                "client_disconnected": self.client_disconnected,
+                "tokens_generated_discarded": self.tokens_generated_discarded,
+                "tokens_saved_estimate": self.tokens_saved,
+                "expected_tokens": {m: round(self.expected_tokens(m), 1)
+                                    for m in self._completed},
+            }
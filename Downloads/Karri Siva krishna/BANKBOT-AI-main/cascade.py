@@ -0,0 +1,88 @@
+# cascade.py - answer simple questions with a small model, escalate the rest
+#
+# Most banking questions ("what is IFSC", "how do I block my card") are
+# short lookups a 0.5B model answers fine in a fraction of llama3's time.
+# A cheap look at the question decides whether to try the small model;
+# a cheap look at its answer decides whether to ask the large one again.
+import re
+import threading
+
+from model_residency import LatencyStats
+
+# Questions that need reasoning, arithmetic or a long answer go straight
+# to the large model
+COMPLEX_MARKERS = re.compile(
+    r"\b(compare|comparison|difference|differences|versus|vs|explain|why|"
+    r"calculate|calculation|emi|interest on|how much|plan|planning|strategy|"
+    r"should i|pros|cons|advice|recommend|tax|step by step|steps)\b"
+)
+NUMBER = re.compile(r"\d")
+
+# The small model saying it doesn't know, or refusing a banking question
+UNSURE_MARKERS = re.compile(
+    r"(i'?m not sure|i am not sure|i don'?t know|i do not know|not certain|"
+    r"cannot answer|can'?t answer|unable to answer|no information|"
+    r"i specialize in banking only)"
+)
+
+
+class CascadeRouter:
+    """Chooses small or large model per question and counts the outcome
+
+    Only requests that leave the model to the proxy (no "model", or
+    "auto") are cascaded; an explicit model is always honoured.
+    """
+
+    def __init__(self, small_model, large_model, enabled=True, max_words=12,
+                 min_answer_words=6):
+        self.small_model = small_model
+        self.large_model = large_model
+        self.enabled = enabled
+        self.max_words = max_words
+        self.min_answer_words = min_answer_words
+        self._lock = threading.Lock()
+        self.routes = {"direct": 0, "small": 0, "escalated": 0, "large": 0}
+        self.latency = {route: LatencyStats() for route in self.routes}
+
+    def is_simple(self, prompt):
+        text = prompt.lower()
+        return (len(text.split()) <= self.max_words
+                and text.count("?") <= 1
+                and not COMPLEX_MARKERS.search(text)
+                and not NUMBER.search(text))
+
+    def choose(self, prompt, requested=None):
+        """(model, route) with route "direct" (caller named a model), "small"
+        (check the answer, maybe escalate) or "large" """
+        if requested and requested != "auto":
+            return requested, "direct"
+        if self.enabled and self.is_simple(prompt):
+            return self.small_model, "small"
+        return self.large_model, "large"
+
+    def needs_escalation(self, answer, done_reason=None):
+        """Cheap confidence check on the small model's answer"""
+        text = (answer or "").strip().lower()
+        return (len(text.split()) < self.min_answer_words
+                or done_reason == "length" and not text.endswith((".", "!", "?"))
+                or bool(UNSURE_MARKERS.search(text)))
+
+    def record(self, route, seconds):
+        """Count an answered request; route "escalated" = small, then large"""
+        with self._lock:
+            self.routes[route] += 1
+            self.latency[route].add(seconds)
+
+    def stats(self):
+        with self._lock:
+            routes = dict(self.routes)
+            latency = {route: s.snapshot() for route, s in self.latency.items()}
+        tried = routes["small"] + routes["escalated"]
+        return {
+            "enabled": self.enabled,
+            "small_model": self.small_model,
+            "large_model": self.large_model,
+            "routes": routes,
+            "escalation_rate": round(routes["escalated"] / tried, 3) if tried else None,
+            "latency": latency,
+        }
@@ -0,0 +1,92 @@
+# health_prober.py - keeps Ollama's status in memory for /health
+import threading
+import time
+
+import requests
+
+
+class HealthProber:
+    """Polls Ollama on a background thread; /health reads the last result"""
+
+    def __init__(self, base_url, interval=5.0, timeout=3.0, on_result=None):
+        self.base_url = base_url
+        self.on_result = on_result  # called with the new state after each probe
+        self.interval = interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = {
+            "ollama": "unknown",
+            "models": [],
+            "loaded_models": [],
+            "probe_latency_ms": None,
+            "last_error": None,
+            "consecutive_failures": 0,
+        }
+        self._checked_at = None   # wall clock, for display
+        self._checked_mono = None  # monotonic, for the age
+
+    def probe(self):
+        """One round trip to /api/tags (installed) and /api/ps (loaded)"""
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f'{self.base_url}/api/tags', timeout=self.timeout)
+            response.raise_for_status()
+            latency_ms = (time.perf_counter() - start) * 1000
+            models = [m.get("name") for m in response.json().get("models", [])]
+        except (requests.RequestException, ValueError) as e:
+            self._record(ollama="not_connected", last_error=type(e).__name__,
+                         consecutive_failures=self._state["consecutive_failures"] + 1)
+            return
+
+        # /api/ps is missing on old Ollama releases; don't fail the probe on it
+        try:
+            ps = self.session.get(f'{self.base_url}/api/ps', timeout=self.timeout)
+            loaded = [m.get("name") for m in ps.json().get("models", [])] if ps.ok else []
+        except (requests.RequestException, ValueError):
+            loaded = []
+
+        self._record(ollama="connected", models=models, loaded_models=loaded,
+                     probe_latency_ms=round(latency_ms, 2), last_error=None,
+                     consecutive_failures=0)
+
+    def _record(self, **state):
+        with self._lock:
+            self._state.update(state)
+            self._checked_at = time.time()
+            self._checked_mono = time.monotonic()
+            current = dict(self._state)
+        if self.on_result:
+            self.on_result(current)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ollama-prober",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """Last known status plus how old it is"""
+        with self._lock:
+            state = dict(self._state)
+            checked_at, checked_mono = self._checked_at, self._checked_mono
+        age = time.monotonic() - checked_mono if checked_mono is not None else None
+        state.update({
+            "checked_at": checked_at,
+            "age_s": round(age, 3) if age is not None else None,
+            # Two missed rounds means the prober itself is stuck
+            "stale": age is None or age > 2 * self.interval + self.timeout,
+            "probe_interval_s": self.interval,
+        })
+        return state
@@ -0,0 +1,240 @@
+# model_residency.py - keep the models we use loaded in Ollama, within a RAM budget
+#
+# The bots in this repo share one Ollama: llama3 (this proxy, Tejaswini
+# main.py, Nishmitha Bot.py), tinyllama (Satyaban), qwen2.5:0.5b (JAISURYA)
+# and gemma3:4b (Tejaswini bank_main.py). Loading a model takes seconds,
+# so configured models are loaded at startup, every request asks Ollama
+# to keep its model resident, and least recently used models are unloaded
+# when the loaded total goes over the budget.
+import threading
+import time
+from collections import deque
+
+import requests
+
+# Ollama reports load_duration on every response; above this it had to
+# read the model from disk
+COLD_LOAD_THRESHOLD_S = 0.2
+
+
+def model_key(name):
+    """Ollama's full name for a model: "llama3" -> "llama3:latest"
+
+    /api/ps and /api/tags report tagged names while requests use whatever
+    the caller typed, so names are compared in this form.
+    """
+    if name and ":" not in name.rsplit("/", 1)[-1]:
+        return f"{name}:latest"
+    return name
+
+
+class LatencyStats:
+    """Recent latencies for one model and kind (cold or warm)"""
+
+    def __init__(self, window=500):
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.recent.append(seconds * 1000)
+
+    def snapshot(self):
+        values = sorted(self.recent)
+        if not values:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(sum(values) / len(values), 1),
+            "p50_ms": round(values[len(values) // 2], 1),
+            "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+        }
+
+
+class ModelState:
+    def __init__(self):
+        self.last_used = None
+        self.in_flight = 0
+        self.requests = 0
+        self.cold = LatencyStats()
+        self.warm = LatencyStats()
+        self.preload_ms = None
+        self.preload_error = None
+
+
+class ResidencyManager:
+    def __init__(self, base_url, preload=(), keep_alive="30m", ram_budget_mb=0,
+                 interval=30.0, timeout=120.0, embed_models=()):
+        self.base_url = base_url
+        self.preload_models = list(preload)
+        # Embedding models refuse /api/generate; they load through /api/embed
+        self.embed_models = {model_key(m) for m in embed_models}
+        self.keep_alive = keep_alive
+        self.ram_budget_mb = ram_budget_mb  # 0 = no budget
+        self.interval = interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._models = {}
+        self._resident = {}  # model -> size in MB, from the last /api/ps
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.unloads = 0
+
+    def _state(self, model):
+        model = model_key(model)
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = ModelState()
+        return state
+
+    # Ollama calls
+
+    def _keep_alive_call(self, model, keep_alive):
+        """Empty request that only loads (or, with keep_alive 0, unloads)"""
+        if model_key(model) in self.embed_models:
+            url, body = f'{self.base_url}/api/embed', {"input": ""}
+        else:
+            url, body = f'{self.base_url}/api/generate', {}
+        body.update(model=model, keep_alive=keep_alive)
+        self.session.post(url, json=body, timeout=self.timeout).raise_for_status()
+
+    def load(self, model):
+        """Load a model without generating anything; returns seconds taken"""
+        start = time.perf_counter()
+        self._keep_alive_call(model, self.keep_alive)
+        return time.perf_counter() - start
+
+    def unload(self, model):
+        self._keep_alive_call(model, 0)
+        with self._lock:
+            self._resident.pop(model_key(model), None)
+            self.unloads += 1
+
+    def refresh(self):
+        """Re-read which models Ollama has loaded and their sizes"""
+        response = self.session.get(f'{self.base_url}/api/ps', timeout=5)
+        response.raise_for_status()
+        resident = {model_key(m["name"]): m.get("size", 0) / (1024 * 1024)
+                    for m in response.json().get("models", [])}
+        with self._lock:
+            self._resident = resident
+
+    # Request hooks
+
+    def begin(self, model):
+        """Called before a chat request; returns the keep_alive to send"""
+        with self._lock:
+            state = self._state(model)
+            state.in_flight += 1
+            state.last_used = time.time()
+        return self.keep_alive
+
+    def end(self, model, seconds, response=None):
+        """Called after a chat request with Ollama's response body, if any"""
+        with self._lock:
+            state = self._state(model)
+            state.in_flight -= 1
+            if response is None:
+                return
+            state.requests += 1
+            load_s = response.get("load_duration", 0) / 1e9
+            (state.cold if load_s >= COLD_LOAD_THRESHOLD_S else state.warm).add(seconds)
+
+    # Budget
+
+    def enforce_budget(self):
+        """Refresh residency, then unload idle models, least recently used
+        first, until the loaded total is under budget"""
+        self.refresh()
+        if not self.ram_budget_mb:
+            return
+        with self._lock:
+            resident = dict(self._resident)
+            total = sum(resident.values())
+            order = sorted(
+                resident,
+                key=lambda m: (self._models[m].last_used or 0) if m in self._models else 0
+            )
+            busy = {m for m, s in self._models.items() if s.in_flight}
+        for model in order:
+            if total <= self.ram_budget_mb:
+                break
+            if model in busy:
+                continue
+            self.unload(model)
+            total -= resident[model]
+
+    def preload(self):
+        """Load configured models that haven't been preloaded yet
+
+        A model that fails to load (not pulled, or Ollama not up yet) is
+        tried again next round; it doesn't hold up the others.
+        """
+        for model in self.preload_models:
+            with self._lock:
+                if self._state(model).preload_ms is not None:
+                    continue
+            try:
+                seconds = self.load(model)
+            except (requests.RequestException, ValueError) as exc:
+                with self._lock:
+                    self._state(model).preload_error = str(exc)
+                continue
+            with self._lock:
+                state = self._state(model)
+                state.preload_ms = round(seconds * 1000, 1)
+                state.preload_error = None
+                state.last_used = state.last_used or time.time()
+            self._try_enforce_budget()
+
+    def _try_enforce_budget(self):
+        try:
+            self.enforce_budget()
+        except (requests.RequestException, ValueError):
+            # Ollama not up yet; try again next round
+            pass
+
+    def _run(self):
+        while True:
+            self.preload()
+            self._try_enforce_budget()
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ollama-residency",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            resident = dict(self._resident)
+            models = {}
+            for name in sorted(set(self._models) | set(resident)):
+                state = self._models.get(name) or ModelState()
+                models[name] = {
+                    "resident": name in resident,
+                    "size_mb": round(resident.get(name, 0), 1),
+                    "requests": state.requests,
+                    "in_flight": state.in_flight,
+                    "idle_s": round(now - state.last_used, 1) if state.last_used else None,
+                    "preload_ms": state.preload_ms,
+                    "preload_error": state.preload_error,
+                    "cold": state.cold.snapshot(),
+                    "warm": state.warm.snapshot(),
+                }
+        return {
+            "keep_alive": self.keep_alive,
+            "ram_budget_mb": self.ram_budget_mb,
+            "resident_mb": round(sum(resident.values()), 1),
+            "preload": self.preload_models,
+            "unloads": self.unloads,
+            "models": models,
+        }
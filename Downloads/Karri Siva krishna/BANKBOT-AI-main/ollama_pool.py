@@ -0,0 +1,106 @@
+# ollama_pool.py - spread requests over several Ollama hosts
+#
+# Routing: skip ejected hosts, then pick the one with the fewest requests
+# outstanding, where a host without the model loaded counts cold_penalty
+# extra requests (a cold load costs seconds, but so does a long queue).
+# A host is ejected for a while after repeated connection errors or 5xx
+# answers, or when its health probe fails.
+import threading
+import time
+
+from model_residency import model_key
+
+
+class OllamaHost:
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.probe_ok = True      # until the first probe says otherwise
+        self.loaded_models = set()  # tagged names, see model_key()
+        self.residency = None     # ResidencyManager, set by the backend
+        self.prober = None        # HealthProber, set by the backend
+
+    def available(self, now):
+        return self.probe_ok and now >= self.ejected_until
+
+
+class OllamaPool:
+    def __init__(self, urls, eject_after=3, eject_for=30.0, cold_penalty=4):
+        self.hosts = [OllamaHost(url.rstrip("/")) for url in urls]
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self.cold_penalty = cold_penalty
+        self._lock = threading.Lock()
+        self.routed_warm = 0
+        self.routed_cold = 0
+        self.ejections = 0
+
+    def acquire(self, model, exclude=()):
+        """Pick a host for the model and count the request against it"""
+        now = time.monotonic()
+        model = model_key(model)
+        with self._lock:
+            candidates = [h for h in self.hosts if h not in exclude] or self.hosts
+            available = [h for h in candidates if h.available(now)]
+            if not available:
+                # Everything is down: try whichever comes back first rather
+                # than refusing outright
+                available = [min(candidates, key=lambda h: h.ejected_until)]
+            host = min(available, key=lambda h: (
+                h.outstanding + (0 if model in h.loaded_models else self.cold_penalty),
+                h.requests,
+            ))
+            if model in host.loaded_models:
+                self.routed_warm += 1
+            else:
+                self.routed_cold += 1
+            host.outstanding += 1
+            host.requests += 1
+            return host
+
+    def release(self, host, ok, model=None):
+        """Finish a request; ok=False counts towards ejecting the host"""
+        with self._lock:
+            host.outstanding -= 1
+            if ok:
+                host.consecutive_failures = 0
+                if model:
+                    host.loaded_models.add(model_key(model))
+                return
+            host.failures += 1
+            host.consecutive_failures += 1
+            if host.consecutive_failures >= self.eject_after:
+                host.consecutive_failures = 0
+                host.ejected_until = time.monotonic() + self.eject_for
+                self.ejections += 1
+
+    def probe_result(self, host, state):
+        """HealthProber callback: health and loaded models for one host"""
+        with self._lock:
+            host.probe_ok = state["ollama"] == "connected"
+            if host.probe_ok:
+                host.loaded_models = {model_key(m) for m in state["loaded_models"]}
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "routed_warm": self.routed_warm,
+                "routed_cold": self.routed_cold,
+                "ejections": self.ejections,
+                "hosts": {
+                    h.url: {
+                        "available": h.available(now),
+                        "probe_ok": h.probe_ok,
+                        "ejected_for_s": round(max(0.0, h.ejected_until - now), 1),
+                        "outstanding": h.outstanding,
+                        "requests": h.requests,
+                        "failures": h.failures,
+                        "loaded_models": sorted(h.loaded_models),
+                    } for h in self.hosts
+                },
+            }
@@ -0,0 +1,351 @@
+# ollama_stub.py - local stand-in for the Ollama HTTP API
+#
+# Models start unloaded; the first call to one pays --load-time, like
+# Ollama reading the weights from disk, and it then stays resident for
+# its keep_alive (default 5m). --parallel caps concurrent generations
+# like OLLAMA_NUM_PARALLEL; the rest queue. --model-latency gives a model
+# its own generation time, and --unsure makes a model answer "I'm not
+# sure" to a fixed share of questions, for the cascade benchmark.
+# /api/embed returns a hashed bag-of-words vector: questions with the same
+# words (any order, case, punctuation or filler) land close together,
+# which is enough to exercise the semantic cache, though unlike a real
+# embedding model it knows no synonyms.
+# Like Ollama, /api/tags and /api/ps report tagged names ("llama3:latest")
+# whichever form a request used, embedding models answer /api/generate and
+# /api/chat with 400, and an /api/embed with empty input only loads or
+# (keep_alive 0) unloads the model.
+#
+# Usage:
+#   python ollama_stub.py --port 11435 --latency 1.0 --load-time 3
+#   OLLAMA_URL=http://localhost:11435 python ai_backend.py
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import zlib
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANSWER = "Banks typically let you transfer money through net banking, UPI or a branch visit."
+UNSURE_ANSWER = "I'm not sure about that."
+
+# Approximate resident sizes in MB for /api/ps
+MODEL_SIZES_MB = {
+    "llama3": 5600,
+    "gemma3:4b": 4200,
+    "tinyllama": 900,
+    "qwen2.5:0.5b": 600,
+    "nomic-embed-text": 270,
+}
+EMBED_DIM = 384
+EMBED_MODELS = {"nomic-embed-text:latest", "all-minilm:latest", "mxbai-embed-large:latest"}
+STOPWORDS = {"a", "an", "the", "i", "my", "me", "do", "does", "can", "to", "is",
+             "are", "for", "of", "how", "what", "please", "you", "in", "on", "one"}
+DEFAULT_KEEP_ALIVE = 300
+
+
+def tagged(name):
+    """"llama3" -> "llama3:latest", the name Ollama lists a model under"""
+    if ":" not in name.rsplit("/", 1)[-1]:
+        return f"{name}:latest"
+    return name
+
+
+def parse_keep_alive(value):
+    """Ollama keep_alive (seconds or "10m"/"1h" style) -> seconds, None = forever"""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return None if value < 0 else float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)\s*([smh]?)", str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    number = float(match.group(1))
+    if number < 0:
+        return None
+    return number * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    # Overridden per server through make_handler()
+    latency = 1.0
+    load_time = 0.0
+    models = ("llama3:latest",)
+    loaded = {}  # tagged model -> monotonic expiry (inf = forever)
+    lock = threading.Lock()
+    aborted = {"generations": 0, "tokens_not_generated": 0}
+    slots = None  # Semaphore when generations are capped
+    model_latency = {}  # tagged model -> seconds, overrides latency
+    unsure = {}  # tagged model -> share of questions answered with UNSURE_ANSWER
+    embed_latency = 0.01
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # caller gave up waiting
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _resident(self):
+        now = time.monotonic()
+        with self.lock:
+            for model in [m for m, expires in self.loaded.items() if expires <= now]:
+                del self.loaded[model]
+            return dict(self.loaded)
+
+    def _ensure_loaded(self, model, keep_alive):
+        """Load the model if needed; returns the load time in seconds"""
+        load_s = 0.0
+        if tagged(model) not in self._resident():
+            time.sleep(self.load_time)
+            load_s = self.load_time
+        seconds = parse_keep_alive(keep_alive)
+        with self.lock:
+            self.loaded[tagged(model)] = (float("inf") if seconds is None
+                                          else time.monotonic() + seconds)
+        return load_s
+
+    def _latency(self, model):
+        return self.model_latency.get(tagged(model), self.latency)
+
+    def _answer(self, model, body):
+        """STUB_ANSWER, or UNSURE_ANSWER for the model's unsure share of
+        questions; the same question always gets the same answer"""
+        rate = self.unsure.get(tagged(model), 0.0)
+        messages = body.get("messages") or [{"content": body.get("prompt", "")}]
+        question = messages[-1].get("content", "")
+        if rate and zlib.crc32(question.encode()) % 1000 < rate * 1000:
+            return UNSURE_ANSWER
+        return STUB_ANSWER
+
+    @staticmethod
+    def _embedding(text):
+        """Unit vector: each remaining word hashed into a dimension"""
+        vector = [0.0] * EMBED_DIM
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            if word in STOPWORDS:
+                continue
+            word = word[:-1] if len(word) > 3 and word.endswith("s") else word
+            digest = hashlib.md5(word.encode()).digest()
+            vector[int.from_bytes(digest[:4], "little") % EMBED_DIM] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _embed(self, body, model):
+        """/api/embed (input: str or list) and the older /api/embeddings"""
+        inputs = body.get("input", "")
+        inputs = ([inputs] if inputs else []) if isinstance(inputs, str) else inputs
+        if self.path == "/api/embed" and not inputs:
+            if parse_keep_alive(body.get("keep_alive")) == 0:
+                with self.lock:
+                    self.loaded.pop(tagged(model), None)
+                self._send_json(200, {"model": model, "embeddings": []})
+                return
+            load_s = self._ensure_loaded(model, body.get("keep_alive"))
+            self._send_json(200, {"model": model, "embeddings": [],
+                                  "load_duration": int(load_s * 1e9)})
+            return
+        load_s = self._ensure_loaded(model, body.get("keep_alive"))
+        time.sleep(self.embed_latency)
+        if self.path == "/api/embeddings":
+            self._send_json(200, {"embedding": self._embedding(body.get("prompt", ""))})
+            return
+        self._send_json(200, {
+            "model": model,
+            "embeddings": [self._embedding(text) for text in inputs],
+            "load_duration": int(load_s * 1e9),
+        })
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": m} for m in self.models]})
+        elif self.path == "/api/ps":
+            self._send_json(200, {"models": [
+                {"name": m, "model": m,
+                 "size": MODEL_SIZES_MB.get(m.removesuffix(":latest"), 1000) * 1024 * 1024}
+                for m in self._resident()
+            ]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = self._read_json()
+        model = body.get("model", "llama3")
+        if self.path not in ("/api/chat", "/api/generate", "/api/embed", "/api/embeddings"):
+            self._send_json(404, {"error": "not found"})
+            return
+        if tagged(model) not in self.models:
+            self._send_json(404, {"error": f"model '{model}' not found"})
+            return
+        if self.path in ("/api/embed", "/api/embeddings"):
+            self._embed(body, model)
+            return
+        if tagged(model) in EMBED_MODELS:
+            self._send_json(400, {"error": f'"{model}" does not support generate'})
+            return
+
+        keep_alive = body.get("keep_alive")
+        # generate with no prompt just loads or (keep_alive 0) unloads
+        if self.path == "/api/generate" and not body.get("prompt"):
+            if parse_keep_alive(keep_alive) == 0:
+                with self.lock:
+                    self.loaded.pop(tagged(model), None)
+                self._send_json(200, {"model": model, "response": "", "done": True,
+                                      "done_reason": "unload"})
+                return
+            load_s = self._ensure_loaded(model, keep_alive)
+            self._send_json(200, {"model": model, "response": "", "done": True,
+                                  "done_reason": "load",
+                                  "load_duration": int(load_s * 1e9)})
+            return
+
+        if self.slots is None:
+            self._generate(body, model, keep_alive)
+        else:
+            with self.slots:
+                self._generate(body, model, keep_alive)
+
+    def _generate(self, body, model, keep_alive):
+        load_s = self._ensure_loaded(model, keep_alive)
+        answer = self._answer(model, body)
+        latency = self._latency(model)
+        if body.get("stream", True) and self.path == "/api/chat":
+            self._stream_chat(model, load_s, answer, latency)
+            return
+
+        time.sleep(latency)
+        reply = {
+            "model": model,
+            "done": True,
+            "load_duration": int(load_s * 1e9),
+            "total_duration": int((load_s + latency) * 1e9),
+            "eval_count": len(answer.split()),
+        }
+        if self.path == "/api/chat":
+            reply["message"] = {"role": "assistant", "content": answer}
+        else:
+            reply["response"] = answer
+        self._send_json(200, reply)
+
+
+    def _stream_chat(self, model, load_s, answer, latency):
+        """NDJSON, one word per line spread over the latency, then done"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(latency / len(words))
+            try:
+                self._write_line({
+                    "model": model,
+                    "message": {"role": "assistant",
+                                "content": word if i == 0 else " " + word},
+                    "done": False,
+                })
+            except (BrokenPipeError, ConnectionResetError):
+                # Like Ollama: the caller hung up, so stop generating
+                with self.lock:
+                    self.aborted["generations"] += 1
+                    self.aborted["tokens_not_generated"] += len(words) - i - 1
+                self.close_connection = True
+                return
+        self._write_line({
+            "model": model,
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "load_duration": int(load_s * 1e9),
+            "total_duration": int((load_s + latency) * 1e9),
+            "eval_count": len(words),
+        })
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_line(self, obj):
+        data = json.dumps(obj).encode() + b"\n"
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def make_handler(latency=1.0, models=("llama3",), load_time=0.0, preloaded=True,
+                 parallel=0, model_latency=None, unsure=None):
+    """Handler class with its own settings and residency state
+
+    preloaded=True starts with every model resident, so only tests that
+    care about load cost see it; a list preloads just those models.
+    parallel > 0 caps concurrent generations. model_latency and unsure
+    are {model: seconds} and {model: share of questions}.
+    """
+    if preloaded is True:
+        preloaded = models
+    forever = float("inf")
+    return type("OllamaStub", (OllamaStubHandler,), {
+        "latency": latency,
+        "load_time": load_time,
+        "models": tuple(tagged(m) for m in models),
+        "loaded": {tagged(m): forever for m in (preloaded or ())},
+        "lock": threading.Lock(),
+        "aborted": {"generations": 0, "tokens_not_generated": 0},
+        "slots": threading.Semaphore(parallel) if parallel > 0 else None,
+        "model_latency": {tagged(m): s for m, s in (model_latency or {}).items()},
+        "unsure": {tagged(m): share for m, share in (unsure or {}).items()},
+    })
+
+
+def serve(port=11435, latency=1.0, models=("llama3",), load_time=0.0, preloaded=True,
+          parallel=0, model_latency=None, unsure=None):
+    """Start a stub in the background and return the server"""
+    server = StubServer(("127.0.0.1", port),
+                        make_handler(latency, models, load_time, preloaded, parallel,
+                                     model_latency, unsure))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Ollama API stub")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--load-time", type=float, default=0.0,
+                        help="seconds to load a model that isn't resident")
+    parser.add_argument("--models", nargs="+", default=["llama3", "nomic-embed-text"])
+    parser.add_argument("--parallel", type=int, default=0,
+                        help="max concurrent generations (0 = unlimited)")
+    parser.add_argument("--model-latency", nargs="*", default=[], metavar="MODEL=SECONDS",
+                        help="per-model generation time, e.g. qwen2.5:0.5b=0.2")
+    parser.add_argument("--unsure", nargs="*", default=[], metavar="MODEL=SHARE",
+                        help="share of questions a model answers with \"I'm not sure\"")
+    args = parser.parse_args()
+
+    def pairs(items):
+        return {m: float(v) for m, v in (item.rsplit("=", 1) for item in items)}
+
+    print(f"🧪 Ollama stub on http://127.0.0.1:{args.port} "
+          f"(latency {args.latency}s, load {args.load_time}s)")
+    StubServer(("127.0.0.1", args.port),
+               make_handler(args.latency, args.models, args.load_time,
+                            preloaded=args.load_time == 0,
+                            parallel=args.parallel,
+                            model_latency=pairs(args.model_latency),
+                            unsure=pairs(args.unsure))).serve_forever()
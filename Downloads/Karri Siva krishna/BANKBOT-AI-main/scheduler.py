@@ -0,0 +1,245 @@
+# scheduler.py - who gets the next Ollama slot
+#
+# Ollama runs a few generations per model at a time and queues the rest
+# in arrival order, so one user firing ten long questions holds everyone
+# else up. The proxy instead lets at most `slots` generations through and
+# queues the rest here: higher priority classes first, and within a class
+# one request per user in turn, so a user's backlog only delays that user.
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+
+from cancellation import RequestCancelled, client_gone, remaining
+from model_residency import LatencyStats
+
+PRIORITIES = ("interactive", "batch", "background")
+PRIORITY_HEADER = "X-Priority"
+
+
+class Overloaded(Exception):
+    """Queue full: the request was refused, or pushed out by a more urgent one"""
+
+
+def classify(named, prompt, interactive_max_words=30):
+    """Priority index: interactive for short questions and batch for long
+    ones; a class the caller names can only lower that, never raise it"""
+    priority = 0 if len(prompt.split()) <= interactive_max_words else 1
+    if named in PRIORITIES:
+        return max(priority, PRIORITIES.index(named))
+    return priority
+
+
+def client_key(headers, remote_addr, trusted_header=""):
+    """Who a request counts as for round robin: the caller's address,
+    never a name it picks. Behind a reverse proxy, trusted_header is the
+    header the proxy overwrites with the real one (X-Real-IP, or
+    X-Forwarded-For, whose last entry the proxy appends)."""
+    if trusted_header:
+        address = headers.get(trusted_header, "").split(",")[-1].strip()
+        if address:
+            return address
+    return remote_addr or "unknown"
+
+
+class Ticket:
+    """One waiting request; woken by the thread that frees a slot"""
+
+    def __init__(self, user, priority):
+        self.user = user
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.shed = False
+        self._event = threading.Event()
+
+    def wake(self):
+        self._event.set()
+
+    def wait(self, timeout):
+        return self._event.wait(timeout)
+
+
+class AsyncTicket(Ticket):
+    """Ticket for a coroutine; may be woken from another thread"""
+
+    def __init__(self, user, priority):
+        super().__init__(user, priority)
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+
+    def wake(self):
+        self._loop.call_soon_threadsafe(
+            lambda: self._future.done() or self._future.set_result(True))
+
+    async def wait_async(self, timeout):
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class AdmissionScheduler:
+    """Priority classes, per-user round robin, bounded queue
+
+    slots=0 admits everything at once (scheduling off). When the queue is
+    full a new request is refused unless it outranks a queued one, in
+    which case the newest request of the lowest queued class is pushed
+    out instead. Both are Overloaded, which the proxy answers with 503.
+    """
+
+    def __init__(self, slots, max_queue=64, poll_interval=0.5):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.poll_interval = poll_interval  # how often waiters check the client
+        self.busy = 0
+        self._queues = [OrderedDict() for _ in PRIORITIES]  # user -> deque of tickets
+        self._queued = 0
+        self._lock = threading.Lock()
+        self.max_depth = 0
+        self.admitted = [0] * len(PRIORITIES)
+        self.rejected = [0] * len(PRIORITIES)
+        self.shed = [0] * len(PRIORITIES)
+        self.abandoned = [0] * len(PRIORITIES)  # deadline or disconnect while queued
+        self.waits = [LatencyStats() for _ in PRIORITIES]
+
+    # Queue bookkeeping, all under self._lock
+
+    def _push(self, ticket):
+        self._queues[ticket.priority].setdefault(ticket.user, deque()).append(ticket)
+        self._queued += 1
+        self.max_depth = max(self.max_depth, self._queued)
+
+    def _remove(self, ticket):
+        users = self._queues[ticket.priority]
+        waiting = users.get(ticket.user)
+        if waiting is None or ticket not in waiting:
+            return False
+        waiting.remove(ticket)
+        if not waiting:
+            del users[ticket.user]
+        self._queued -= 1
+        return True
+
+    def _pop_next(self):
+        """Head of the first non-empty class, taking users in turn"""
+        for users in self._queues:
+            if users:
+                user, waiting = next(iter(users.items()))
+                ticket = waiting.popleft()
+                del users[user]
+                if waiting:
+                    users[user] = waiting  # back of the line for this user
+                self._queued -= 1
+                return ticket
+        return None
+
+    def _grant(self, ticket):
+        ticket.granted = True
+        self.admitted[ticket.priority] += 1
+        self.waits[ticket.priority].add(time.monotonic() - ticket.enqueued)
+
+    def _enqueue(self, ticket):
+        """Grant now, queue, or raise Overloaded; returns the ticket pushed
+        out to make room, if any, for the caller to wake"""
+        if not self.slots or self.busy < self.slots and not self._queued:
+            self.busy += 1
+            self._grant(ticket)
+            return None
+        victim = None
+        if self._queued >= self.max_queue:
+            lowest = max((p for p, users in enumerate(self._queues) if users), default=-1)
+            if lowest <= ticket.priority:
+                self.rejected[ticket.priority] += 1
+                raise Overloaded()
+            victim = max((t for waiting in self._queues[lowest].values() for t in waiting),
+                         key=lambda t: t.enqueued)
+            self._remove(victim)
+            victim.shed = True
+            self.shed[lowest] += 1
+        self._push(ticket)
+        return victim
+
+    def _settle(self, ticket):
+        """After waking or timing out: True if the slot is ours"""
+        with self._lock:
+            if ticket.granted:
+                return True
+            if ticket.shed:
+                raise Overloaded()
+            self._remove(ticket)
+            self.abandoned[ticket.priority] += 1
+            return False
+
+    # Public API
+
+    def acquire(self, user, priority, deadline, environ=None):
+        """Block until this request may call Ollama; raises Overloaded, or
+        RequestCancelled if the deadline passes or the client leaves first"""
+        ticket = Ticket(user, priority)
+        with self._lock:
+            victim = self._enqueue(ticket)
+        if victim:
+            victim.wake()
+        while not ticket.granted and not ticket.shed:
+            left = remaining(deadline)
+            if left <= 0:
+                break
+            ticket.wait(min(left, self.poll_interval))
+            if environ is not None and not ticket.granted and client_gone(environ):
+                if not self._settle(ticket):
+                    raise RequestCancelled("disconnect")
+        if not self._settle(ticket):
+            raise RequestCancelled("deadline")
+
+    async def acquire_async(self, user, priority, deadline):
+        """acquire() for coroutines; a disconnect cancels the task"""
+        ticket = AsyncTicket(user, priority)
+        with self._lock:
+            victim = self._enqueue(ticket)
+        if victim:
+            victim.wake()
+        try:
+            if not ticket.granted:
+                await ticket.wait_async(max(remaining(deadline), 0))
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = ticket.granted
+                if not granted and self._remove(ticket):
+                    self.abandoned[ticket.priority] += 1
+            if granted:
+                self.release()  # handed a slot just as we left; pass it on
+            raise
+        if not self._settle(ticket):
+            raise RequestCancelled("deadline")
+
+    def release(self):
+        """Free a slot, handing it straight to the next waiter if any"""
+        with self._lock:
+            ticket = self._pop_next()
+            if ticket is None:
+                self.busy = max(0, self.busy - 1)
+                return
+            self._grant(ticket)
+        ticket.wake()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "busy": self.busy,
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+                "max_depth": self.max_depth,
+                "classes": {
+                    name: {
+                        "queued": sum(len(w) for w in self._queues[p].values()),
+                        "users_waiting": len(self._queues[p]),
+                        "admitted": self.admitted[p],
+                        "rejected": self.rejected[p],
+                        "shed": self.shed[p],
+                        "abandoned": self.abandoned[p],
+                        "wait": self.waits[p].snapshot(),
+                    } for p, name in enumerate(PRIORITIES)
+                },
+            }
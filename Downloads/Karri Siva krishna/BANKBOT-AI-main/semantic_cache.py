@@ -0,0 +1,217 @@
+# semantic_cache.py - reuse answers for questions that mean the same thing
+#
+# "how do I get a cheque book" and "steps to request cheque book" are the
+# same question to a customer but different strings to an exact-match
+# cache. Each answered question is embedded (Ollama /api/embed, a few ms)
+# and kept as a unit vector in a NumPy matrix; a new question whose
+# cosine similarity to a stored one clears the threshold gets the stored
+# answer instead of a generation that takes seconds.
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from model_residency import LatencyStats
+
+
+class SemanticCache:
+    """Fixed-capacity vector index with LRU eviction and .npz snapshots
+
+    Entries live in a scope (the model that answered, or "auto" for the
+    proxy's own choice) so an answer is only reused for the same kind of
+    request. All methods are thread safe.
+    """
+
+    def __init__(self, embed_model, threshold=0.9, max_entries=2000,
+                 snapshot_path=None, save_every=25):
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.snapshot_path = snapshot_path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one snapshot write at a time
+        self._saving = False          # a background save is running
+        self._vectors = None          # (max_entries, dim) float32, rows unit length
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._scope_ids = np.zeros(max_entries, dtype=np.int32)
+        self._entries = []            # row -> {"query", "answer", "model", "scope"}
+        self._scopes = {}             # scope -> id
+        self._clock = 0               # bumped on every use, for LRU
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.search = LatencyStats()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _scope_id(self, scope):
+        return self._scopes.setdefault(scope, len(self._scopes))
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector, scope):
+        """(entry, similarity) of the closest stored question in the scope
+        if it clears the threshold, else (None, best similarity)"""
+        start = time.perf_counter()
+        query = self._unit(vector)
+        with self._lock:
+            n = len(self._entries)
+            best, row = 0.0, -1
+            if n and scope in self._scopes and self._vectors.shape[1] == query.shape[0]:
+                sims = self._vectors[:n] @ query
+                sims[self._scope_ids[:n] != self._scopes[scope]] = -1.0
+                row = int(np.argmax(sims))
+                best = float(sims[row])
+            if row >= 0 and best >= self.threshold:
+                self._last_used[row] = self._tick()
+                self.hits += 1
+                entry = self._entries[row]
+            else:
+                self.misses += 1
+                entry = None
+            self.search.add(time.perf_counter() - start)
+        return entry, best
+
+    def add(self, vector, query, answer, model, scope):
+        """Store an answered question, evicting the least recently used
+        entry when full; a near duplicate replaces the stored answer"""
+        vector = self._unit(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                # First entry, or the embedding model changed: start over
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]),
+                                         dtype=np.float32)
+                self._entries = []
+            n = len(self._entries)
+            sid = self._scope_id(scope)
+            row = -1
+            if n:
+                sims = self._vectors[:n] @ vector
+                sims[self._scope_ids[:n] != sid] = -1.0
+                nearest = int(np.argmax(sims))
+                if sims[nearest] >= self.threshold:
+                    row = nearest
+            if row < 0 and n < self.max_entries:
+                row = n
+                self._entries.append(None)
+            elif row < 0:
+                row = int(np.argmin(self._last_used[:n]))
+                self.evictions += 1
+            self._vectors[row] = vector
+            self._scope_ids[row] = sid
+            self._last_used[row] = self._tick()
+            self._entries[row] = {"query": query, "answer": answer,
+                                  "model": model, "scope": scope}
+            self._unsaved += 1
+            save = (self.snapshot_path and self._unsaved >= self.save_every
+                    and not self._saving)
+            if save:
+                self._saving = True
+        if save:
+            # Off the request path: writing the snapshot takes longer than
+            # the lookup the request came for
+            threading.Thread(target=self._background_save, daemon=True).start()
+
+    def _background_save(self):
+        try:
+            self.save()
+        finally:
+            with self._lock:
+                self._saving = False
+
+    # Snapshots
+
+    def save(self):
+        """Write the index to snapshot_path atomically (via a temp file in
+        the same directory); returns False if it could not be written"""
+        if not self.snapshot_path:
+            return False
+        with self._save_lock:
+            with self._lock:
+                n = len(self._entries)
+                if self._vectors is None:
+                    return False
+                arrays = {
+                    "vectors": self._vectors[:n].copy(),
+                    "last_used": self._last_used[:n].copy(),
+                    "meta": np.array(json.dumps({
+                        "embed_model": self.embed_model,
+                        "entries": self._entries,
+                    })),
+                }
+                unsaved, self._unsaved = self._unsaved, 0
+            directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+            tmp = None
+            try:
+                fd, tmp = tempfile.mkstemp(suffix=".tmp.npz", dir=directory)
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp, self.snapshot_path)
+            except OSError as exc:
+                # A snapshot is only a warm start; never fail a request over it
+                print(f"Semantic cache snapshot not saved: {exc}")
+                if tmp and os.path.exists(tmp):
+                    os.unlink(tmp)
+                with self._lock:
+                    self._unsaved += unsaved
+                return False
+        return True
+
+    def load(self):
+        """Restore a snapshot written by save(); returns entries loaded.
+        A snapshot from another embedding model is ignored."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with np.load(self.snapshot_path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                vectors = data["vectors"]
+                last_used = data["last_used"]
+        except (OSError, ValueError, KeyError):
+            return 0
+        if meta.get("embed_model") != self.embed_model or not len(vectors):
+            return 0
+        # Keep the most recently used entries if the snapshot is bigger
+        keep = np.argsort(last_used)[::-1][:self.max_entries]
+        with self._lock:
+            self._vectors = np.zeros((self.max_entries, vectors.shape[1]),
+                                     dtype=np.float32)
+            self._entries = []
+            for row, old in enumerate(keep):
+                entry = meta["entries"][old]
+                self._vectors[row] = vectors[old]
+                self._scope_ids[row] = self._scope_id(entry["scope"])
+                self._last_used[row] = last_used[old]
+                self._entries.append(entry)
+            self._clock = int(last_used.max())
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "embed_model": self.embed_model,
+                "threshold": self.threshold,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "search": self.search.snapshot(),
+                "snapshot": self.snapshot_path,
+            }
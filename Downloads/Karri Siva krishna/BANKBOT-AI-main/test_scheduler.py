@@ -0,0 +1,197 @@
+# test_scheduler.py - priority classes, per-user round robin, shedding, deadlines
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cancellation import RequestCancelled
+from scheduler import AdmissionScheduler, Overloaded, classify, client_key
+
+INTERACTIVE, BATCH, BACKGROUND = 0, 1, 2
+
+
+def wait_until(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def queue_state(scheduler):
+    stats = scheduler.stats()
+    return stats["queued"], sum(c["shed"] for c in stats["classes"].values())
+
+
+class Waiter:
+    """A thread blocked in acquire(); records when it gets the slot"""
+
+    def __init__(self, scheduler, user, priority, granted, timeout=5.0):
+        self.user = user
+        self.error = None
+        self.done = threading.Event()
+        before = queue_state(scheduler)
+
+        def run():
+            try:
+                scheduler.acquire(user, priority, time.monotonic() + timeout)
+                granted.append(user)
+            except (Overloaded, RequestCancelled) as e:
+                self.error = e
+            self.done.set()
+
+        threading.Thread(target=run, daemon=True).start()
+        # Queued (or already refused) before the next one arrives
+        wait_until(lambda: queue_state(scheduler) != before or self.done.is_set())
+
+
+def release_in_turn(scheduler, granted, count):
+    for i in range(count):
+        scheduler.release()
+        wait_until(lambda: len(granted) > i)
+
+
+def test_free_slots_admit_at_once():
+    scheduler = AdmissionScheduler(slots=2)
+    scheduler.acquire("a", INTERACTIVE, time.monotonic() + 1)
+    scheduler.acquire("b", BATCH, time.monotonic() + 1)
+    assert scheduler.stats()["busy"] == 2
+    scheduler.release()
+    scheduler.release()
+    assert scheduler.stats()["busy"] == 0
+
+
+def test_slots_zero_admits_everything():
+    scheduler = AdmissionScheduler(slots=0)
+    for user in "abcdef":
+        scheduler.acquire(user, BATCH, time.monotonic() + 1)
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_users_take_turns_within_a_class():
+    scheduler = AdmissionScheduler(slots=1)
+    scheduler.acquire("holder", INTERACTIVE, time.monotonic() + 1)
+    granted = []
+    for user in ["heavy", "heavy", "heavy", "b", "c"]:
+        Waiter(scheduler, user, INTERACTIVE, granted)
+    assert scheduler.stats()["classes"]["interactive"]["users_waiting"] == 3
+
+    release_in_turn(scheduler, granted, 5)
+    assert granted == ["heavy", "b", "c", "heavy", "heavy"]
+
+
+def test_higher_class_goes_first():
+    scheduler = AdmissionScheduler(slots=1)
+    scheduler.acquire("holder", INTERACTIVE, time.monotonic() + 1)
+    granted = []
+    Waiter(scheduler, "bg", BACKGROUND, granted)
+    Waiter(scheduler, "batch", BATCH, granted)
+    Waiter(scheduler, "chat", INTERACTIVE, granted)
+
+    release_in_turn(scheduler, granted, 3)
+    assert granted == ["chat", "batch", "bg"]
+
+
+def test_full_queue_sheds_newest_of_lowest_class():
+    scheduler = AdmissionScheduler(slots=1, max_queue=2)
+    scheduler.acquire("holder", INTERACTIVE, time.monotonic() + 1)
+    granted = []
+    old = Waiter(scheduler, "a", BATCH, granted)
+    new = Waiter(scheduler, "b", BATCH, granted)
+
+    urgent = Waiter(scheduler, "c", INTERACTIVE, granted)
+    assert new.done.wait(1) and isinstance(new.error, Overloaded)
+    assert not old.done.is_set() and not urgent.done.is_set()
+
+    release_in_turn(scheduler, granted, 2)
+    assert granted == ["c", "a"]
+    stats = scheduler.stats()["classes"]
+    assert stats["batch"]["shed"] == 1
+
+
+def test_full_queue_refuses_when_nothing_ranks_lower():
+    scheduler = AdmissionScheduler(slots=1, max_queue=2)
+    scheduler.acquire("holder", INTERACTIVE, time.monotonic() + 1)
+    granted = []
+    Waiter(scheduler, "a", INTERACTIVE, granted)
+    Waiter(scheduler, "b", BATCH, granted)
+
+    with pytest.raises(Overloaded):
+        scheduler.acquire("c", BATCH, time.monotonic() + 1)
+    assert scheduler.stats()["classes"]["batch"]["rejected"] == 1
+    assert scheduler.stats()["queued"] == 2
+
+
+def test_deadline_while_queued():
+    scheduler = AdmissionScheduler(slots=1, poll_interval=0.05)
+    scheduler.acquire("holder", INTERACTIVE, time.monotonic() + 1)
+
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled) as exc:
+        scheduler.acquire("late", INTERACTIVE, time.monotonic() + 0.2)
+    assert exc.value.reason == "deadline"
+    assert 0.15 < time.monotonic() - start < 1.0
+
+    stats = scheduler.stats()
+    assert stats["queued"] == 0
+    assert stats["classes"]["interactive"]["abandoned"] == 1
+    # The abandoned request doesn't take the slot when it frees
+    scheduler.release()
+    assert scheduler.stats()["busy"] == 0
+
+
+def test_async_waiter_gets_released_slot():
+    async def main():
+        scheduler = AdmissionScheduler(slots=1)
+        await scheduler.acquire_async("holder", INTERACTIVE, time.monotonic() + 1)
+        waiter = asyncio.create_task(
+            scheduler.acquire_async("next", INTERACTIVE, time.monotonic() + 2))
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["queued"] == 1
+        scheduler.release()
+        await asyncio.wait_for(waiter, 1)
+        assert scheduler.stats()["busy"] == 1
+
+    asyncio.run(main())
+
+
+def test_async_cancel_leaves_the_queue():
+    async def main():
+        scheduler = AdmissionScheduler(slots=1)
+        await scheduler.acquire_async("holder", INTERACTIVE, time.monotonic() + 1)
+        waiter = asyncio.create_task(
+            scheduler.acquire_async("gone", INTERACTIVE, time.monotonic() + 5))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        stats = scheduler.stats()
+        assert stats["queued"] == 0
+        assert stats["classes"]["interactive"]["abandoned"] == 1
+        scheduler.release()
+        assert scheduler.stats()["busy"] == 0
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("named, prompt, expected", [
+    ("background", "hi", BACKGROUND),
+    (None, "what is IFSC", INTERACTIVE),
+    (None, " ".join(["word"] * 31), BATCH),
+    ("bogus", "what is IFSC", INTERACTIVE),
+    ("batch", "what is IFSC", BATCH),
+    # Naming a class never lifts a long prompt above batch
+    ("interactive", " ".join(["word"] * 31), BATCH),
+])
+def test_classify(named, prompt, expected):
+    assert classify(named, prompt) == expected
+
+
+@pytest.mark.parametrize("headers, trusted, expected", [
+    ({"X-User-Id": "someone-else"}, "", "10.0.0.5"),
+    ({"X-Forwarded-For": "1.2.3.4, 10.9.8.7"}, "", "10.0.0.5"),
+    ({"X-Forwarded-For": "1.2.3.4, 10.9.8.7"}, "X-Forwarded-For", "10.9.8.7"),
+    ({}, "X-Real-IP", "10.0.0.5"),
+])
+def test_client_key_ignores_untrusted_headers(headers, trusted, expected):
+    assert client_key(headers, "10.0.0.5", trusted) == expected
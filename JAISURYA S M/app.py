@@ -9,6 +9,8 @@ import json
 import os
 import pyttsx3
 from datetime import datetime
+from keyword_index import KeywordIndex
+from bm25_index import BM25Index
 
 # -----------------------------
 # CONFIG
@@ -22,12 +24,6 @@ SYSTEM_PROMPT = (
 CHAT_FILE = "chat_history.json"
 BANK_LIB_FILE = "banking_library.json"
 
-# -----------------------------
-# LOAD BANK LIBRARY
-# -----------------------------
-with open(BANK_LIB_FILE, "r", encoding="utf-8") as f:
-    BANK_LIBRARY = json.load(f)
-
 # -----------------------------
 # BANKING KEYWORDS (FINAL GATE)
 # -----------------------------
@@ -40,9 +36,24 @@ BANKING_KEYWORDS = {
     "savings", "current"
 }
 
+# -----------------------------
+# LOAD BANK LIBRARY
+# -----------------------------
+# Library and gate keywords compiled into one automaton, plus a BM25
+# index for reworded questions; loaded once per version of the file,
+# not on every Streamlit rerun
+@st.cache_resource(show_spinner=False)
+def load_bank_library(path, mtime):
+    with open(path, "r", encoding="utf-8") as f:
+        library = json.load(f)
+    return library, KeywordIndex(library, BANKING_KEYWORDS), BM25Index(library)
+
+BANK_LIBRARY, KEYWORD_INDEX, BM25_INDEX = load_bank_library(
+    BANK_LIB_FILE, os.path.getmtime(BANK_LIB_FILE)
+)
+
 def is_banking_question(text: str) -> bool:
-    text = text.lower()
-    return any(k in text for k in BANKING_KEYWORDS)
+    return KEYWORD_INDEX.scan(text)[1]
 
 # -----------------------------
 # CHAT STORAGE
@@ -84,23 +95,11 @@ def find_account(acc_no):
 # -----------------------------
 # RULE-BASED BANK LIBRARY
 # -----------------------------
+# 1️⃣ STRONG (multi-word keyword) matches first
+# 2️⃣ generic match ONLY if question is short (3 words or less)
+# See keyword_index.py
 def check_bank_library(text):
-    t = text.lower()
-
-    # 1️⃣ First: try STRONG (exact / long keyword) matches
-    for item in BANK_LIBRARY.values():
-        for kw in item["keywords"]:
-            if kw in t and len(kw.split()) > 1:
-                return item["answer"]
-
-    # 2️⃣ Then: allow generic match ONLY if question is short
-    if len(t.split()) <= 3:
-        for item in BANK_LIBRARY.values():
-            for kw in item["keywords"]:
-                if kw in t:
-                    return item["answer"]
-
-    return None
+    return KEYWORD_INDEX.scan(text)[0]
 
 # -----------------------------
 # OLLAMA CALL (BANKING ONLY)
@@ -337,12 +336,13 @@ with st.form("chat_form", clear_on_submit=True):
             reply = "🔐 Use sidebar forms for secure banking information."
 
         else:
-            rule_answer = check_bank_library(user_text)
+            # One pass finds both the library answer and the banking gate
+            rule_answer, banking = KEYWORD_INDEX.scan(user_text)
 
             if rule_answer:
                 reply = rule_answer
 
-            elif not is_banking_question(user_text):
+            elif not banking:
                 reply = (
                     "❌ I am a banking-only assistant.\n\n"
                     "You can ask about:\n"
@@ -354,7 +354,9 @@ with st.form("chat_form", clear_on_submit=True):
                 )
 
             else:
-                reply = call_ollama(
+                # Closest library topic, if it covers the question well
+                # enough, before the (slow) LLM
+                reply = BM25_INDEX.best_answer(user_text) or call_ollama(
                     f"{SYSTEM_PROMPT}\nUser: {user_text}\nAssistant:"
                 )
 
@@ -0,0 +1,137 @@
+# bench_bm25.py - LLM calls the BM25 stage saves, and its lookup time
+#
+# 1. Replays the questions in chat_history.json through the chat flow
+#    (PIN guard, keyword library, banking gate) and counts those that
+#    reached call_ollama before and would still reach it with BM25.
+#    Then does the same for questions that reword library topics, with the
+#    topic each should get, to show what it catches and whether it guesses.
+# 2. Times BM25Index.search on synthetic libraries of tens of thousands
+#    of topics.
+#   python bench_bm25.py --history chat_history.json --topics 10000 50000
+import argparse
+import json
+import os
+import random
+import time
+
+from bm25_index import BM25Index
+from bench_keyword_index import BANKING_KEYWORDS, WORDS, synthetic_library
+from keyword_index import KeywordIndex
+
+# Reworded questions about topics banking_library.json has, and the topic
+# that answers each (None: the library has no right answer)
+PARAPHRASES = [
+    ("tell me about loans for studying", "education_loan"),
+    ("can I get loans for my studies abroad", "education_loan"),
+    ("rate of interest in banks", "interest_rate"),
+    ("what interest do banks pay on savings", "interest_rate"),
+    ("which documents are needed for kyc verification", "kyc"),
+    ("account for my business transactions", "current_account"),
+    ("what kinds of personal loans do banks give", "loan"),
+    ("how do I see my account balance", "balance_check"),
+    ("how to close my credit card", None),
+    ("what is a demat account", None),
+]
+
+
+def route(question, keywords, bm25):
+    """Where app.py sends a question: "guard", "library", "refused",
+    "bm25" or "llm" (bm25=None is the flow without the BM25 stage)"""
+    lower = question.lower()
+    if "pin" in lower or "account number" in lower:
+        return "guard", None
+    answer, banking = keywords.scan(question)
+    if answer:
+        return "library", answer
+    if not banking:
+        return "refused", None
+    answer = bm25.best_answer(question) if bm25 else None
+    return ("bm25", answer) if answer else ("llm", None)
+
+
+def replay_history(path, library):
+    with open(path, encoding="utf-8") as f:
+        sessions = json.load(f).get("sessions", [])
+    questions = [msg for s in sessions for role, msg in s.get("messages", [])
+                 if role == "You"]
+    keywords = KeywordIndex(library, BANKING_KEYWORDS)
+    bm25 = BM25Index(library)
+    names = list(library)
+
+    before = [q for q in questions if route(q, keywords, None)[0] == "llm"]
+    print(f"📜 {path}: {len(questions)} questions, {len(before)} went to the LLM")
+    avoided = 0
+    for q in before:
+        kind, _ = route(q, keywords, bm25)
+        hits = bm25.search(q)
+        best = f"{names[hits[0][1]]} {hits[0][0]:.2f}" if hits else "no topic shares a word"
+        avoided += kind == "bm25"
+        print(f"   {'✅ bm25' if kind == 'bm25' else '   llm '}  {q!r:40} best: {best}")
+    print(f"   LLM calls avoided: {avoided} of {len(before)} "
+          f"(threshold {bm25.min_score})")
+
+
+def replay_paraphrases(library):
+    keywords = KeywordIndex(library, BANKING_KEYWORDS)
+    bm25 = BM25Index(library)
+    names = list(library)
+    llm = answered = wrong = 0
+    print("🔁 reworded library questions")
+    for q, expected in PARAPHRASES:
+        if route(q, keywords, None)[0] != "llm":
+            continue
+        llm += 1
+        hits = bm25.search(q)
+        got = names[hits[0][1]] if hits and hits[0][0] >= bm25.min_score else None
+        answered += got is not None
+        wrong += got is not None and got != expected
+        mark = "✅" if got == expected else "❌"
+        score = f"{hits[0][0]:.2f}" if hits else "-"
+        print(f"   {mark} {q!r:45} → {got or 'llm'} ({score}), want {expected or 'llm'}")
+    print(f"   {llm} went to the LLM; BM25 answers {answered}, {wrong} of them wrongly")
+
+
+def bench_search(topics, rng, lookups=2000):
+    library = synthetic_library(topics, rng)
+    start = time.perf_counter()
+    bm25 = BM25Index(library)
+    build_s = time.perf_counter() - start
+    keywords = [kw for item in library.values() for kw in item["keywords"]]
+    questions = []
+    for _ in range(lookups):
+        words = rng.choice(keywords).split() + rng.sample(WORDS, rng.randint(1, 4))
+        rng.shuffle(words)
+        questions.append(" ".join(words))
+    times = []
+    for q in questions:
+        start = time.perf_counter()
+        bm25.search(q)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"   {topics:7d} topics: build {build_s:5.2f} s, search p50 "
+          f"{times[len(times) // 2] * 1e6:6.0f} µs, p99 {times[int(len(times) * 0.99)] * 1e6:6.0f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", default="chat_history.json")
+    parser.add_argument("--library", default="banking_library.json")
+    parser.add_argument("--topics", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    with open(args.library, encoding="utf-8") as f:
+        library = json.load(f)
+    if os.path.exists(args.history):
+        replay_history(args.history, library)
+    else:
+        print(f"📜 {args.history} not found (it is local to each install); skipping replay")
+    replay_paraphrases(library)
+
+    print("⏱️  BM25 search")
+    rng = random.Random(7)
+    for topics in args.topics:
+        bench_search(topics, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# bench_keyword_index.py - library lookup: keyword scan vs automaton
+#
+# Builds synthetic libraries of thousands of topics (plus the real
+# banking_library.json), checks that KeywordIndex gives exactly the same
+# answers and gate decisions as the old loops for every question, and
+# times both.
+#   python bench_keyword_index.py --topics 1000 5000 20000
+import argparse
+import json
+import random
+import time
+
+from keyword_index import KeywordIndex
+
+# Same set as app.py (importing app.py would start Streamlit)
+BANKING_KEYWORDS = {
+    "bank", "account", "balance", "loan", "emi", "interest",
+    "deposit", "withdraw", "atm", "card", "debit", "credit",
+    "ifsc", "branch", "cheque", "fd", "rd",
+    "fixed deposit", "recurring deposit",
+    "kyc", "passbook", "statement", "transaction",
+    "savings", "current"
+}
+
+QUESTIONS = [
+    "about loan", "how to get cheque book", "web developer", "kyc",
+    "what documents are needed for an education loan",
+    "how do I check balance of my savings account", "current account",
+    "what is the interest rate on a fixed deposit", "tell me a joke",
+    "I want a student loan for my masters abroad", "bank loan", "atm pin reset",
+    "what is ifsc", "how to open a business account online",
+]
+
+WORDS = ("account loan card deposit interest balance cheque branch credit debit "
+         "savings current fixed recurring home personal education vehicle gold "
+         "business student salary pension nri minor joint online mobile upi neft "
+         "rtgs imps locker nominee passbook statement kyc pan aadhaar emi tenure "
+         "foreclosure prepayment overdraft mortgage insurance mutual fund demat").split()
+
+
+# The loops app.py used before KeywordIndex
+
+def naive_library(library, text):
+    t = text.lower()
+    for item in library.values():
+        for kw in item["keywords"]:
+            if kw in t and len(kw.split()) > 1:
+                return item["answer"]
+    if len(t.split()) <= 3:
+        for item in library.values():
+            for kw in item["keywords"]:
+                if kw in t:
+                    return item["answer"]
+    return None
+
+
+def naive_banking(text):
+    text = text.lower()
+    return any(k in text for k in BANKING_KEYWORDS)
+
+
+def synthetic_library(topics, rng):
+    library = {}
+    for i in range(topics):
+        keywords = []
+        for _ in range(rng.randint(2, 5)):
+            n = rng.choice((1, 2, 2, 3))
+            # A made-up word keeps most keywords distinct, like real topic names
+            words = rng.sample(WORDS, n - 1) + [f"{rng.choice(WORDS)}{i}"]
+            rng.shuffle(words)
+            keywords.append(" ".join(words))
+        library[f"topic_{i}"] = {"keywords": keywords, "answer": f"Answer {i}"}
+    return library
+
+
+def questions_for(library, rng, count):
+    """Real questions, plus ones built around keywords from the library"""
+    keywords = [kw for item in library.values() for kw in item["keywords"]]
+    questions = list(QUESTIONS)
+    while len(questions) < count:
+        kw = rng.choice(keywords)
+        filler = rng.sample(WORDS + ["how", "do", "i", "what", "is", "my"], rng.randint(0, 6))
+        questions.append(" ".join(filler[:3] + [kw] + filler[3:]))
+    return questions
+
+
+def timed(fn, questions, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in questions:
+            fn(q)
+    return (time.perf_counter() - start) / (repeat * len(questions))
+
+
+def bench(name, library, questions, repeat):
+    start = time.perf_counter()
+    index = KeywordIndex(library, BANKING_KEYWORDS)
+    build_s = time.perf_counter() - start
+
+    for q in questions:
+        expected = (naive_library(library, q), naive_banking(q))
+        assert index.scan(q) == expected, (q, index.scan(q), expected)
+
+    naive = timed(lambda q: (naive_library(library, q), naive_banking(q)), questions, repeat)
+    fast = timed(index.scan, questions, repeat)
+    keywords = sum(len(item["keywords"]) for item in library.values())
+    print(f"{name:>12} {len(library):7d} {keywords:8d} {build_s * 1000:9.1f} "
+          f"{naive * 1e6:11.1f} {fast * 1e6:9.1f} {naive / fast:8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    print(f"{'library':>12} {'topics':>7} {'keywords':>8} {'build ms':>9} "
+          f"{'loops µs/q':>11} {'index µs/q':>9} {'speedup':>9}")
+    with open("banking_library.json", encoding="utf-8") as f:
+        real = json.load(f)
+    bench("real", real, QUESTIONS, 200)
+    for topics in args.topics:
+        library = synthetic_library(topics, rng)
+        bench("synthetic", library, questions_for(library, rng, args.questions), args.repeat)
+    print("answers and gate identical to the old loops on every question")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bm25_index.py - ranked library search for questions without an exact keyword
+#
+# "tell me about loans for studying" contains no library keyword as
+# typed, so it used to go to Ollama even though the education loan topic
+# answers it. Each topic's keywords and answer are indexed as one
+# document (keywords counted KEYWORD_WEIGHT times, they say what the
+# topic is about) and questions are scored with BM25.
+#
+# A topic is only used when it covers enough of the question: the score
+# is divided by the most the question's words could score, so a question
+# mostly about something the library doesn't know ("saving account" when
+# there is no savings topic) stays with the LLM.
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "in", "on", "for",
+    "and", "or", "with", "how", "what", "which", "when", "where", "why", "who",
+    "do", "does", "can", "could", "i", "me", "my", "you", "your", "we", "it",
+    "about", "tell", "please", "want", "need", "get", "give", "know", "there",
+    "this", "that", "any", "some", "will", "would", "should", "hai", "hi",
+}
+KEYWORD_WEIGHT = 3
+
+
+def tokenize(text):
+    """Lower-case words without stopwords, with plural and -ing/-ed endings
+    trimmed so "loans" and "studying" meet "loan" and "study" """
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if word.endswith("ies") and len(word) > 4:
+            word = word[:-3] + "y"
+        elif word.endswith(("ing", "ed")) and len(word) > 6:
+            word = word[:-3] if word.endswith("ing") else word[:-2]
+        elif word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """BM25 over the library's topics, postings stored as NumPy arrays"""
+
+    def __init__(self, library, k1=1.5, b=0.75, min_score=0.5):
+        self.k1 = k1
+        self.min_score = min_score  # share of the question's best possible score
+        self.answers = [item["answer"] for item in library.values()]
+        docs = []
+        for item in library.values():
+            terms = Counter(tokenize(item["answer"]))
+            for kw in item["keywords"]:
+                for token in tokenize(kw):
+                    terms[token] += KEYWORD_WEIGHT
+            docs.append(terms)
+
+        n = len(docs)
+        lengths = np.array([sum(d.values()) for d in docs], dtype=np.float32)
+        avg = float(lengths.mean()) if n else 1.0
+        postings = {}
+        for doc_id, terms in enumerate(docs):
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        # CSR layout: term t's documents and weights are at offsets[t]:offsets[t + 1]
+        self.vocab = {}
+        offsets = [0]
+        doc_ids, weights, idf = [], [], []
+        for term, plist in postings.items():
+            self.vocab[term] = len(self.vocab)
+            term_idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            idf.append(term_idf)
+            for doc_id, tf in plist:
+                norm = k1 * (1 - b + b * lengths[doc_id] / avg)
+                doc_ids.append(doc_id)
+                weights.append(term_idf * tf * (k1 + 1) / (tf + norm))
+            offsets.append(len(doc_ids))
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.doc_ids = np.array(doc_ids, dtype=np.int32)
+        self.weights = np.array(weights, dtype=np.float32)
+        self.idf = np.array(idf, dtype=np.float32)
+        # A word no topic uses counts as the rarest possible word
+        self.unknown_idf = math.log(1 + (n + 0.5) / 0.5)
+        self.size = n
+
+    def search(self, text, top_k=1):
+        """[(relative score, topic index), ...] best first"""
+        terms = set(tokenize(text))
+        if not terms or not self.size:
+            return []
+        ids = [self.vocab[t] for t in terms if t in self.vocab]
+        if not ids:
+            return []
+        best_possible = (float(self.idf[ids].sum())
+                         + self.unknown_idf * (len(terms) - len(ids))) * (self.k1 + 1)
+        slices = [slice(self.offsets[i], self.offsets[i + 1]) for i in ids]
+        scores = np.bincount(np.concatenate([self.doc_ids[s] for s in slices]),
+                             weights=np.concatenate([self.weights[s] for s in slices]),
+                             minlength=self.size)
+        if top_k == 1:
+            top = [int(np.argmax(scores))]
+        else:
+            top = np.argpartition(-scores, min(top_k, self.size) - 1)[:top_k]
+            top = sorted(top.tolist(), key=lambda d: (-scores[d], d))
+        return [(float(scores[d]) / best_possible, d) for d in top if scores[d] > 0]
+
+    def best_answer(self, text):
+        """Answer of the top topic if it clears min_score, else None"""
+        hits = self.search(text)
+        if hits and hits[0][0] >= self.min_score:
+            return self.answers[hits[0][1]]
+        return None
@@ -0,0 +1,102 @@
+# keyword_index.py - one-pass keyword matching for the bank library
+#
+# check_bank_library and is_banking_question used to test every keyword
+# with `kw in text`, which is fine for 7 topics but grows with every
+# keyword added. Here all library and gate keywords are compiled once
+# into an Aho-Corasick automaton that reads the question one character
+# at a time and reports every keyword ending at each position, so the
+# cost depends on the question's length, not the library's size.
+#
+# Same rules as before (plain substring matching on the lower-cased text):
+#   1. a multi-word keyword wins; the earliest topic in the library with one
+#   2. otherwise, for questions of 3 words or less, the earliest topic
+#      with any keyword
+#   3. the question is banking if any gate keyword appears
+
+
+class KeywordIndex:
+    def __init__(self, library, gate_keywords=()):
+        self.answers = [item["answer"] for item in library.values()]
+        # Per automaton state: earliest topic with a multi-word keyword
+        # ending here, earliest topic with any keyword, gate keyword or not.
+        # None / False until set.
+        self._goto = [{}]
+        self._multi = [None]
+        self._any = [None]
+        self._gate = [False]
+
+        for topic, item in enumerate(library.values()):
+            for kw in item["keywords"]:
+                self._add(kw, topic=topic, multi=len(kw.split()) > 1)
+        for kw in gate_keywords:
+            self._add(kw, gate=True)
+        self._link()
+
+    def _add(self, keyword, topic=None, multi=False, gate=False):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._multi.append(None)
+                self._any.append(None)
+                self._gate.append(False)
+            state = nxt
+        if topic is not None:
+            self._any[state] = _earliest(self._any[state], topic)
+            if multi:
+                self._multi[state] = _earliest(self._multi[state], topic)
+        if gate:
+            self._gate[state] = True
+
+    def _link(self):
+        """Failure links, breadth first; each state also takes on the
+        matches of its failure state (the keywords that are its suffixes)"""
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = fail
+                self._multi[nxt] = _earliest(self._multi[nxt], self._multi[fail])
+                self._any[nxt] = _earliest(self._any[nxt], self._any[fail])
+                self._gate[nxt] = self._gate[nxt] or self._gate[fail]
+                queue.append(nxt)
+
+    def scan(self, text):
+        """(library answer or None, is banking) for a question, in one pass"""
+        t = text.lower()
+        goto, fail = self._goto, self._fail
+        # An empty keyword is "in" every text, as before
+        multi, any_topic, gate = self._multi[0], self._any[0], self._gate[0]
+        state = 0
+        for ch in t:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if self._any[state] is not None:
+                multi = _earliest(multi, self._multi[state])
+                any_topic = _earliest(any_topic, self._any[state])
+            gate = gate or self._gate[state]
+
+        if multi is not None:
+            return self.answers[multi], gate
+        if any_topic is not None and len(t.split()) <= 3:
+            return self.answers[any_topic], gate
+        return None, gate
+
+    def __len__(self):
+        return len(self._goto)
+
+
+def _earliest(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)